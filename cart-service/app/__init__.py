@@ -1,14 +1,39 @@
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from dotenv import load_dotenv
+import asyncio
 from app.db import engine
 from app.models import Base
 from app.api import api_router
+from app.services import (
+    CART_EXPIRY_INTERVAL_SECONDS,
+    CART_FLUSH_INTERVAL_SECONDS,
+    CART_TTL_SECONDS,
+    cart_tier,
+    product_catalog,
+    run_cart_expiry,
+)
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    """Ensure tables exist, expire abandoned carts while serving, and run the hot tier's flusher when enabled."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    tasks = []
+    if CART_TTL_SECONDS > 0 and CART_EXPIRY_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_cart_expiry(CART_EXPIRY_INTERVAL_SECONDS)))
+    if cart_tier is not None:
+        tasks.append(asyncio.create_task(cart_tier.run(CART_FLUSH_INTERVAL_SECONDS)))
     yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if cart_tier is not None:
+        await cart_tier.close()
+    await product_catalog.aclose()
+    await engine.dispose()
     
 def create_app() -> FastAPI:
     load_dotenv()
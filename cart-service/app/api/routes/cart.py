@@ -1,25 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.db import get_db
 from app.models import Cart, CartItem
 from app.schemas import (
+    CartItemAddOperation,
+    CartItemBatch,
     CartItemCreate,
+    CartItemOperation,
     CartItemReplace,
+    CartItemRemoveOperation,
+    CartItemSetOperation,
     CartItemUpdate,
     CartCreate,
     CartRead,
+    CartRevalidation,
+    CartSummary,
+)
+from app.services import (
+    CartItemNotFound,
+    CartState,
+    CartVersionConflict,
+    CatalogUnavailable,
+    ProductCatalog,
+    cart_tier,
+    check_lines,
+    get_product_catalog,
 )
 
 from typing import Annotated
 
 
-DbSession = Annotated[Session, Depends(get_db)]
+DbSession = Annotated[AsyncSession, Depends(get_db)]
 
 router = APIRouter(prefix="/carts", tags=["carts"])
 
 
+MAX_VERSION_DIGITS = 18
+
+
+def _parse_if_match(if_match: Annotated[str | None, Header()] = None) -> set[int] | None:
+    """Versions the client accepts, or None when the write is unconditional."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        value = tag.strip().removeprefix("W/").strip('"')
+        # A tag this service never issued can only fail to match. The length cap keeps int()
+        # clear of Python's digit limit; no real version comes close to it.
+        issued = value.isascii() and value.isdigit() and len(value) <= MAX_VERSION_DIGITS
+        versions.add(int(value) if issued else -1)
+    return versions
+
+
+def _wants_minimal(prefer: Annotated[str | None, Header()] = None) -> bool:
+    return prefer is not None and "return=minimal" in prefer.replace(" ", "").split(",")
+
+
+IfMatch = Annotated[set[int] | None, Depends(_parse_if_match)]
+ReturnMinimal = Annotated[bool, Depends(_wants_minimal)]
+Catalog = Annotated[ProductCatalog, Depends(get_product_catalog)]
+
+
 def _cart_query(user_id: int | None = None, cart_id: int | None = None):
     stmt = select(Cart).options(selectinload(Cart.items))
     if user_id is not None:
@@ -29,15 +74,143 @@ def _cart_query(user_id: int | None = None, cart_id: int | None = None):
     return stmt
 
 
-def _get_cart_or_404(db: Session, user_id: int) -> Cart:
-    cart = db.execute(_cart_query(user_id=user_id)).scalar_one_or_none()
+def _conflict(version: int | None) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"message": "Cart was modified by another request", "version": version},
+    )
+
+
+def _check_version(cart: Cart, expected: set[int] | None) -> None:
+    if expected is not None and cart.version not in expected:
+        raise _conflict(cart.version)
+
+
+async def _get_cart_or_404(db: AsyncSession, user_id: int, expected: set[int] | None = None) -> Cart:
+    cart = (await db.execute(_cart_query(user_id=user_id))).scalar_one_or_none()
     if cart is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
+    _check_version(cart, expected)
     return cart
 
 
-def _reload_cart(db: Session, cart_id: int) -> Cart:
-    return db.execute(_cart_query(cart_id=cart_id)).scalar_one()
+async def _get_or_create_cart(db: AsyncSession, user_id: int, expected: set[int] | None = None) -> Cart:
+    cart = (await db.execute(_cart_query(user_id=user_id))).scalar_one_or_none()
+    if cart is None:
+        if expected is not None:
+            raise _conflict(None)
+        # Initialise the collection up front so appending never triggers a lazy load.
+        cart = Cart(user_id=user_id, items=[])
+        db.add(cart)
+        await db.flush()
+    _check_version(cart, expected)
+    return cart
+
+
+def _set_totals(cart: Cart) -> None:
+    # The items are already loaded by every write, so the totals cost no extra query.
+    cart.item_count = sum(item.quantity for item in cart.items)
+    cart.subtotal = sum(item.quantity * item.unit_price for item in cart.items)
+
+
+async def _commit(db: AsyncSession, cart: Cart) -> None:
+    """Commit a change to the cart or its items as a new cart version with fresh totals."""
+    _set_totals(cart)
+    # Touching the cart row makes item-only changes issue the versioned UPDATE too.
+    cart.updated_at = func.now()
+    try:
+        await db.commit()
+    except StaleDataError:
+        # Another request committed a newer version between our read and this write.
+        await db.rollback()
+        raise _conflict(None)
+
+
+async def _reload_cart(db: AsyncSession, cart_id: int) -> Cart:
+    # populate_existing refreshes server-generated columns, which must not be lazy-loaded under asyncio.
+    stmt = _cart_query(cart_id=cart_id).execution_options(populate_existing=True)
+    return (await db.execute(stmt)).scalar_one()
+
+
+def _summarize(cart: Cart) -> CartSummary:
+    return CartSummary(
+        id=cart.id,
+        user_id=cart.user_id,
+        version=cart.version,
+        item_count=cart.item_count,
+        subtotal=int(cart.subtotal),
+    )
+
+
+async def _respond(db: AsyncSession, cart: Cart, response: Response, minimal: bool) -> Cart | CartSummary:
+    """Return the written cart, or only its version and totals when the client asked for a minimal reply."""
+    response.headers["ETag"] = f'"{cart.version}"'
+    if minimal:
+        response.headers["Preference-Applied"] = "return=minimal"
+        return _summarize(cart)
+    return await _reload_cart(db, cart.id)
+
+
+def _summarize_state(state: CartState) -> CartSummary:
+    return CartSummary(
+        id=state.cart_id,
+        user_id=state.user_id,
+        version=state.version,
+        item_count=state.item_count,
+        subtotal=state.subtotal,
+    )
+
+
+def _read_state(state: CartState) -> CartRead:
+    return CartRead(
+        id=state.cart_id,
+        user_id=state.user_id,
+        version=state.version,
+        item_count=state.item_count,
+        subtotal=state.subtotal,
+        created_at=state.created_at,
+        updated_at=state.updated_at,
+        items=[
+            {
+                "cart_id": state.cart_id,
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "unit_price": line.unit_price,
+                "created_at": line.created_at,
+                "updated_at": line.updated_at,
+            }
+            for line in state.lines.values()
+        ],
+    )
+
+
+async def _apply_hot(
+    db: AsyncSession,
+    user_id: int,
+    operations: list[CartItemOperation],
+    response: Response,
+    expected: set[int] | None,
+    minimal: bool,
+    replace: bool = False,
+    create: bool = False,
+    batch: bool = False,
+) -> CartRead | CartSummary:
+    """Run a write through the hot tier and shape the reply like the database path does."""
+    try:
+        state = await cart_tier.apply(db, user_id, operations, expected, replace=replace, create=create)
+    except CartVersionConflict as exc:
+        raise _conflict(exc.version)
+    except CartItemNotFound as exc:
+        detail = {"message": "Item not found", "index": exc.index, "product_id": exc.product_id} if batch else "Item not found"
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    if state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
+
+    response.headers["ETag"] = f'"{state.version}"'
+    if minimal:
+        response.headers["Preference-Applied"] = "return=minimal"
+        return _summarize_state(state)
+    return _read_state(state)
 
 
 def _materialize_item(payload: CartItemCreate) -> CartItem:
@@ -49,32 +222,64 @@ def _materialize_item(payload: CartItemCreate) -> CartItem:
 
 
 @router.get("/{user_id}", summary="Get the user's cart", response_model=CartRead,status_code=status.HTTP_200_OK)
-def get_cart(user_id: int, db: DbSession) -> CartRead:
-    return _get_cart_or_404(db, user_id)
+async def get_cart(user_id: int, response: Response, db: DbSession) -> CartRead:
+    if cart_tier is not None:
+        state = await cart_tier.read(db, user_id)
+        if state is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
+        response.headers["ETag"] = f'"{state.version}"'
+        return _read_state(state)
+
+    cart = await _get_cart_or_404(db, user_id)
+    response.headers["ETag"] = f'"{cart.version}"'
+    return cart
 
 
-@router.post("", summary="Create a cart", response_model=CartRead, status_code=status.HTTP_201_CREATED)
-def create_cart(payload: CartCreate, db: DbSession) -> CartRead:
-    existing = db.execute(_cart_query(user_id=payload.user_id)).scalar_one_or_none()
+@router.get("/{user_id}/summary", summary="Get the cart's version and totals", response_model=CartSummary)
+async def get_cart_summary(user_id: int, response: Response, db: DbSession) -> CartSummary:
+    """Serve the mini-cart badge from the stored totals without loading any items."""
+    state = await cart_tier.store.get(user_id) if cart_tier is not None else None
+    if state is not None:
+        summary = _summarize_state(state)
+    else:
+        row = (
+            await db.execute(
+                select(Cart.id, Cart.user_id, Cart.version, Cart.item_count, Cart.subtotal).where(Cart.user_id == user_id)
+            )
+        ).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
+        summary = CartSummary.model_validate(row._asdict())
+
+    response.headers["ETag"] = f'"{summary.version}"'
+    return summary
+
+
+@router.post("", summary="Create a cart", response_model=CartRead | CartSummary, status_code=status.HTTP_201_CREATED)
+async def create_cart(
+    payload: CartCreate, response: Response, minimal: ReturnMinimal, db: DbSession
+) -> CartRead | CartSummary:
+    existing = (await db.execute(_cart_query(user_id=payload.user_id))).scalar_one_or_none()
     if existing is not None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cart already exists")
 
-    cart = Cart(user_id=payload.user_id)
-    for item in payload.items:
-        cart.items.append(_materialize_item(item))
+    cart = Cart(user_id=payload.user_id, items=[_materialize_item(item) for item in payload.items])
+    _set_totals(cart)
 
     db.add(cart)
-    db.commit()
-    return _reload_cart(db, cart.id)
+    await db.commit()
+    return await _respond(db, cart, response, minimal)
 
 
-@router.post("/{user_id}/items", summary="Add or increment an item", response_model=CartRead)
-def add_item(user_id: int, item: CartItemCreate, db: DbSession) -> CartRead:
-    cart = db.execute(_cart_query(user_id=user_id)).scalar_one_or_none()
-    if cart is None:
-        cart = Cart(user_id=user_id)
-        db.add(cart)
-        db.flush()
+@router.post("/{user_id}/items", summary="Add or increment an item", response_model=CartRead | CartSummary)
+async def add_item(
+    user_id: int, item: CartItemCreate, response: Response, expected: IfMatch, minimal: ReturnMinimal, db: DbSession
+) -> CartRead | CartSummary:
+    if cart_tier is not None:
+        operation = CartItemAddOperation(op="add", **item.model_dump())
+        return await _apply_hot(db, user_id, [operation], response, expected, minimal, create=True)
+
+    cart = await _get_or_create_cart(db, user_id, expected)
 
     existing_item = next((ci for ci in cart.items if ci.product_id == item.product_id), None)
     if existing_item is not None:
@@ -83,21 +288,119 @@ def add_item(user_id: int, item: CartItemCreate, db: DbSession) -> CartRead:
     else:
         cart.items.append(_materialize_item(item))
 
-    db.commit()
-    return _reload_cart(db, cart.id)
-    return _reload_cart(db, cart.id)
+    await _commit(db, cart)
+    return await _respond(db, cart, response, minimal)
+
+
+@router.post(
+    "/{user_id}/items/batch",
+    summary="Apply several item operations at once",
+    response_model=CartRead | CartSummary,
+)
+async def batch_items(
+    user_id: int, payload: CartItemBatch, response: Response, expected: IfMatch, minimal: ReturnMinimal, db: DbSession
+) -> CartRead | CartSummary:
+    """Apply add, set and remove operations in order and commit them together, or none of them."""
+    if cart_tier is not None:
+        return await _apply_hot(db, user_id, payload.operations, response, expected, minimal, create=True, batch=True)
+
+    cart = await _get_or_create_cart(db, user_id, expected)
+    items = {item.product_id: item for item in cart.items}
+
+    for index, operation in enumerate(payload.operations):
+        item = items.get(operation.product_id)
+        if isinstance(operation, CartItemAddOperation):
+            if item is None:
+                items[operation.product_id] = item = _materialize_item(operation)
+                cart.items.append(item)
+            else:
+                item.quantity += operation.quantity
+                item.unit_price = operation.unit_price
+            continue
+
+        if item is None:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={"message": "Item not found", "index": index, "product_id": operation.product_id},
+            )
+        if isinstance(operation, CartItemRemoveOperation):
+            cart.items.remove(items.pop(operation.product_id))
+            continue
+        if operation.quantity is not None:
+            item.quantity = operation.quantity
+        if operation.unit_price is not None:
+            item.unit_price = operation.unit_price
+
+    await _commit(db, cart)
+    return await _respond(db, cart, response, minimal)
+
+
+@router.post("/{user_id}/revalidate", summary="Check prices and stock against the catalog", response_model=CartRevalidation)
+async def revalidate_cart(user_id: int, response: Response, catalog: Catalog, db: DbSession) -> CartRevalidation:
+    """Reprice stale lines from product-service in one batched lookup and flag lines that cannot be fulfilled."""
+    if cart_tier is not None:
+        state = await cart_tier.read(db, user_id)
+        if state is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
+        version = state.version
+        lines = [(line.product_id, line.quantity, line.unit_price) for line in state.lines.values()]
+    else:
+        cart = await _get_cart_or_404(db, user_id)
+        version = cart.version
+        lines = [(item.product_id, item.quantity, int(item.unit_price)) for item in cart.items]
+
+    try:
+        snapshots = await catalog.lookup([product_id for product_id, _, _ in lines])
+    except CatalogUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Product service unavailable") from exc
+
+    checks = check_lines(lines, snapshots)
+    repriced = [check for check in checks if check.previous_unit_price is not None]
+    if not repriced:
+        read = _read_state(state) if cart_tier is not None else CartRead.model_validate(cart)
+        response.headers["ETag"] = f'"{version}"'
+    elif cart_tier is not None:
+        # Only the version read above may be repriced, so a write racing the lookup wins and this returns 409.
+        operations = [CartItemSetOperation(op="set", product_id=check.product_id, unit_price=check.unit_price) for check in repriced]
+        read = await _apply_hot(db, user_id, operations, response, {version}, minimal=False)
+    else:
+        prices = {check.product_id: check.unit_price for check in repriced}
+        for item in cart.items:
+            if item.product_id in prices:
+                item.unit_price = prices[item.product_id]
+        await _commit(db, cart)
+        read = await _respond(db, cart, response, minimal=False)
+
+    return CartRevalidation(
+        cart=read,
+        lines=checks,
+        repriced=len(repriced),
+        unavailable=sum(check.status == "unavailable" for check in checks),
+    )
 
 
 @router.patch(
     "/{user_id}/items/{product_id}",
     summary="Update item quantity or price",
-    response_model=CartRead,
+    response_model=CartRead | CartSummary,
 )
-def update_item(user_id: int, product_id: int, payload: CartItemUpdate, db: DbSession) -> CartRead:
+async def update_item(
+    user_id: int,
+    product_id: int,
+    payload: CartItemUpdate,
+    response: Response,
+    expected: IfMatch,
+    minimal: ReturnMinimal,
+    db: DbSession,
+) -> CartRead | CartSummary:
     if payload.quantity is None and payload.unit_price is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nothing to update")
+    if cart_tier is not None:
+        operation = CartItemSetOperation(op="set", product_id=product_id, **payload.model_dump())
+        return await _apply_hot(db, user_id, [operation], response, expected, minimal)
 
-    cart = _get_cart_or_404(db, user_id)
+    cart = await _get_cart_or_404(db, user_id, expected)
     item = next((ci for ci in cart.items if ci.product_id == product_id), None)
     if item is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
@@ -107,50 +410,78 @@ def update_item(user_id: int, product_id: int, payload: CartItemUpdate, db: DbSe
     if payload.unit_price is not None:
         item.unit_price = payload.unit_price
 
-    db.commit()
-    return _reload_cart(db, cart.id)
+    await _commit(db, cart)
+    return await _respond(db, cart, response, minimal)
 
 
-@router.put("/{user_id}/items", summary="Replace all items", response_model=CartRead)
-def replace_items(user_id: int, payload: CartItemReplace, db: DbSession) -> CartRead:
-    cart = _get_cart_or_404(db, user_id)
+@router.put("/{user_id}/items", summary="Replace all items", response_model=CartRead | CartSummary)
+async def replace_items(
+    user_id: int, payload: CartItemReplace, response: Response, expected: IfMatch, minimal: ReturnMinimal, db: DbSession
+) -> CartRead | CartSummary:
+    if cart_tier is not None:
+        operations = [CartItemAddOperation(op="add", **item.model_dump()) for item in payload.items]
+        return await _apply_hot(db, user_id, operations, response, expected, minimal, replace=True)
+
+    cart = await _get_cart_or_404(db, user_id, expected)
     cart.items.clear()
     for item in payload.items:
         cart.items.append(_materialize_item(item))
 
-    db.commit()
-    return _reload_cart(db, cart.id)
+    await _commit(db, cart)
+    return await _respond(db, cart, response, minimal)
 
 
 @router.delete(
     "/{user_id}/items/{product_id}",
     summary="Remove a single item",
-    response_model=CartRead,
+    response_model=CartRead | CartSummary,
 )
-def remove_item(user_id: int, product_id: int, db: DbSession) -> CartRead:
-    cart = _get_cart_or_404(db, user_id)
+async def remove_item(
+    user_id: int, product_id: int, response: Response, expected: IfMatch, minimal: ReturnMinimal, db: DbSession
+) -> CartRead | CartSummary:
+    if cart_tier is not None:
+        operation = CartItemRemoveOperation(op="remove", product_id=product_id)
+        return await _apply_hot(db, user_id, [operation], response, expected, minimal)
+
+    cart = await _get_cart_or_404(db, user_id, expected)
     item = next((ci for ci in cart.items if ci.product_id == product_id), None)
     if item is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
 
-    db.delete(item)
-    db.commit()
-    return _reload_cart(db, cart.id)
+    cart.items.remove(item)
+    await _commit(db, cart)
+    return await _respond(db, cart, response, minimal)
+
 
+@router.delete("/{user_id}/items", summary="Remove all items", response_model=CartRead | CartSummary)
+async def clear_cart(
+    user_id: int, response: Response, expected: IfMatch, minimal: ReturnMinimal, db: DbSession
+) -> CartRead | CartSummary:
+    if cart_tier is not None:
+        return await _apply_hot(db, user_id, [], response, expected, minimal, replace=True)
 
-@router.delete("/{user_id}/items", summary="Remove all items", response_model=CartRead)
-def clear_cart(user_id: int, db: DbSession) -> CartRead:
-    cart = _get_cart_or_404(db, user_id)
+    cart = await _get_cart_or_404(db, user_id, expected)
     cart.items.clear()
-    db.commit()
-    return _reload_cart(db, cart.id)
+    await _commit(db, cart)
+    return await _respond(db, cart, response, minimal)
 
 
 @router.delete("/{user_id}", summary="Delete the cart", status_code=status.HTTP_204_NO_CONTENT)
-def delete_cart(user_id: int, db: DbSession) -> None:
-    cart = db.execute(_cart_query(user_id=user_id)).scalar_one_or_none()
-    if cart is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
-
-    db.delete(cart)
-    db.commit()
+async def delete_cart(user_id: int, expected: IfMatch, db: DbSession) -> None:
+    if cart_tier is not None:
+        try:
+            deleted = await cart_tier.delete(db, user_id, expected)
+        except CartVersionConflict as exc:
+            raise _conflict(exc.version)
+        if not deleted:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart not found")
+        return
+
+    cart = await _get_cart_or_404(db, user_id, expected)
+
+    await db.delete(cart)
+    try:
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        raise _conflict(None)
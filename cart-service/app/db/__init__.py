@@ -1,4 +1,3 @@
-from app.db.session import engine, get_db
-
-__all__ = ("engine", "get_db")
+from app.db.session import SessionLocal, engine, get_db
 
+__all__ = ("SessionLocal", "engine", "get_db")
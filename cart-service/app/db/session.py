@@ -1,25 +1,30 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
-from typing import Generator
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from typing import AsyncGenerator
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
-connect_args = {"check_same_thread":False} if DATABASE_URL.startswith("sqlite") else {}
 
-engine = create_engine(
-    url=DATABASE_URL,
-    connect_args=connect_args,
+# Sync URLs are mapped onto their async drivers so existing DATABASE_URL values keep working.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+engine = create_async_engine(
+    url=ASYNC_DATABASE_URL,
     future=True,
     pool_pre_ping= True
 )
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# expire_on_commit=False: attribute access after a commit must not trigger implicit IO under asyncio.
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
-def get_db() -> Generator[Session,None,None]:
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
-        
-        
- 
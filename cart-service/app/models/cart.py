@@ -1,7 +1,7 @@
 from app.models.base import Base
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, Numeric, String, DateTime, func, ForeignKey
+from sqlalchemy import Index, Integer, Numeric, String, DateTime, func, ForeignKey
 from datetime import datetime
 
 class Cart(Base):
@@ -9,6 +9,11 @@ class Cart(Base):
     
     id:Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    # Bumped by the ORM on every UPDATE, which only matches the row while it still has the version read.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+    # Maintained by every write in the same transaction, so summaries never load the items.
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    subtotal: Mapped[float] = mapped_column(Numeric(12, 2), nullable=False, default=0, server_default="0")
     
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -28,6 +33,10 @@ class Cart(Base):
         lazy="joined"
     )
     
+    # Expiry walks carts oldest first in batches.
+    __table_args__ = (Index("ix_carts_updated_at_id", "updated_at", "id"),)
+    __mapper_args__ = {"version_id_col": version}
+    
     def __repr__(self):
         return f"Cart(id={self.id}, user_id={self.user_id})"
 
@@ -1,3 +1,37 @@
-from app.schemas.cart import CartBase,CartCreate,CartItemBase,CartItemCreate,CartItemRead,CartItemReplace,CartItemUpdate,CartRead,CartUpdate
+from app.schemas.cart import (
+    CartBase,
+    CartCreate,
+    CartItemAddOperation,
+    CartItemBase,
+    CartItemBatch,
+    CartItemCreate,
+    CartItemOperation,
+    CartItemRead,
+    CartItemRemoveOperation,
+    CartItemReplace,
+    CartItemSetOperation,
+    CartItemUpdate,
+    CartLineCheck,
+    CartRead,
+    CartRevalidation,
+    CartSummary,
+)
 
-__all__ = ("CartBase","CartCreate","CartItemBase","CartItemCreate","CartItemRead","CartItemReplace","CartItemUpdate","CartRead","CartUpdate")
\ No newline at end of file
+__all__ = (
+    "CartBase",
+    "CartCreate",
+    "CartItemAddOperation",
+    "CartItemBase",
+    "CartItemBatch",
+    "CartItemCreate",
+    "CartItemOperation",
+    "CartItemRead",
+    "CartItemRemoveOperation",
+    "CartItemReplace",
+    "CartItemSetOperation",
+    "CartItemUpdate",
+    "CartLineCheck",
+    "CartRead",
+    "CartRevalidation",
+    "CartSummary",
+)
@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Annotated, List, Literal, Optional, Union
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class CartItemBase(BaseModel):
@@ -21,8 +21,38 @@ class CartItemUpdate(BaseModel):
 class CartItemReplace(BaseModel):
     items: List[CartItemCreate] = Field(default_factory=list)
 
+class CartItemAddOperation(CartItemBase):
+    op: Literal["add"]
+
+
+class CartItemSetOperation(CartItemUpdate):
+    op: Literal["set"]
+    product_id: int = Field(gt=0)
+
+    @model_validator(mode="after")
+    def require_change(self) -> "CartItemSetOperation":
+        if self.quantity is None and self.unit_price is None:
+            raise ValueError("Nothing to update")
+        return self
+
+
+class CartItemRemoveOperation(BaseModel):
+    op: Literal["remove"]
+    product_id: int = Field(gt=0)
+
+
+CartItemOperation = Annotated[
+    Union[CartItemAddOperation, CartItemSetOperation, CartItemRemoveOperation],
+    Field(discriminator="op"),
+]
+
+
+class CartItemBatch(BaseModel):
+    operations: List[CartItemOperation] = Field(min_length=1, max_length=100)
+
 class CartItemRead(CartItemBase):
-    id: int
+    # None for lines served from the write-behind hot tier, which does not track row ids.
+    id: Optional[int] = None
     cart_id: int
     created_at: datetime
     updated_at: datetime
@@ -41,11 +71,38 @@ class CartCreate(CartBase):
     pass
 
 
+class CartSummary(BaseModel):
+    id: int
+    user_id: int
+    version: int
+    item_count: int
+    subtotal: int
+
+
 class CartRead(CartBase):
     id: int
     user_id: int
+    version: int
+    item_count: int
+    subtotal: int
     items: List[CartItemRead]
     created_at: datetime
     updated_at: datetime
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CartLineCheck(BaseModel):
+    product_id: int
+    status: Literal["ok", "price_changed", "insufficient_stock", "unavailable"]
+    quantity: int
+    unit_price: int
+    previous_unit_price: Optional[int] = Field(default=None, description="Set when the line was repriced to the catalog price.")
+    available_stock: Optional[int] = None
+
+
+class CartRevalidation(BaseModel):
+    cart: CartRead
+    lines: List[CartLineCheck]
+    repriced: int
+    unavailable: int
@@ -0,0 +1,53 @@
+"""Service-layer helpers shared by the API routes."""
+
+from app.services.cart_store import CartLine, CartState, CartStore, InMemoryCartStore, RedisCartStore
+from app.services.catalog import (
+    CatalogUnavailable,
+    ProductCatalog,
+    ProductSnapshot,
+    check_lines,
+    get_product_catalog,
+    product_catalog,
+)
+from app.services.expiry import (
+    CART_EXPIRY_INTERVAL_SECONDS,
+    CART_TTL_SECONDS,
+    ExpiryReport,
+    expire_carts,
+    run_cart_expiry,
+)
+from app.services.hot_tier import (
+    CART_FLUSH_INTERVAL_SECONDS,
+    CartItemNotFound,
+    CartVersionConflict,
+    HotCartTier,
+    apply_operations,
+    build_hot_tier,
+    cart_tier,
+)
+
+__all__ = (
+    "CART_EXPIRY_INTERVAL_SECONDS",
+    "CART_FLUSH_INTERVAL_SECONDS",
+    "CART_TTL_SECONDS",
+    "CartItemNotFound",
+    "CartLine",
+    "CartState",
+    "CartStore",
+    "CartVersionConflict",
+    "CatalogUnavailable",
+    "ExpiryReport",
+    "HotCartTier",
+    "InMemoryCartStore",
+    "ProductCatalog",
+    "ProductSnapshot",
+    "RedisCartStore",
+    "apply_operations",
+    "build_hot_tier",
+    "cart_tier",
+    "check_lines",
+    "expire_carts",
+    "get_product_catalog",
+    "product_catalog",
+    "run_cart_expiry",
+)
@@ -0,0 +1,299 @@
+"""Stores holding active carts for the write-behind hot tier.
+
+A store keeps the latest state of each hot cart plus a dirty index of carts with
+writes the database has not seen yet. Writes are compare-and-set on the cart
+version, so two writers holding the same version cannot both win, whether they
+share a process (`InMemoryCartStore`) or a Redis server (`RedisCartStore`).
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Protocol
+import json
+import time
+
+
+@dataclass
+class CartLine:
+    product_id: int
+    quantity: int
+    unit_price: int
+    created_at: datetime
+    updated_at: datetime
+
+
+@dataclass
+class CartState:
+    cart_id: int
+    user_id: int
+    version: int
+    created_at: datetime
+    updated_at: datetime
+    lines: dict[int, CartLine] = field(default_factory=dict)
+
+    @property
+    def item_count(self) -> int:
+        return sum(line.quantity for line in self.lines.values())
+
+    @property
+    def subtotal(self) -> int:
+        return sum(line.quantity * line.unit_price for line in self.lines.values())
+
+    def copy(self) -> "CartState":
+        return replace(self, lines={product_id: replace(line) for product_id, line in self.lines.items()})
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "cart_id": self.cart_id,
+                "user_id": self.user_id,
+                "version": self.version,
+                "created_at": self.created_at.isoformat(),
+                "updated_at": self.updated_at.isoformat(),
+                "lines": [
+                    [line.product_id, line.quantity, line.unit_price, line.created_at.isoformat(), line.updated_at.isoformat()]
+                    for line in self.lines.values()
+                ],
+            }
+        )
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "CartState":
+        data = json.loads(raw)
+        lines = (
+            CartLine(product_id, quantity, unit_price, datetime.fromisoformat(created), datetime.fromisoformat(updated))
+            for product_id, quantity, unit_price, created, updated in data["lines"]
+        )
+        return cls(
+            cart_id=data["cart_id"],
+            user_id=data["user_id"],
+            version=data["version"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+            lines={line.product_id: line for line in lines},
+        )
+
+
+class CartStore(Protocol):
+    async def get(self, user_id: int) -> CartState | None:
+        """Return the hot state of a cart, or None when it is not held."""
+
+    async def load(self, state: CartState) -> CartState:
+        """Hold a cart read from the database as clean, unless a state is already held; return the held state."""
+
+    async def put(self, state: CartState, expected_version: int) -> bool:
+        """Replace the cart if it is still at `expected_version` and mark it dirty; False on a lost race."""
+
+    async def dirty(self, limit: int) -> list[CartState]:
+        """Return up to `limit` carts with writes not yet flushed."""
+
+    async def is_dirty(self, user_id: int) -> bool:
+        """Whether the cart has writes not yet flushed."""
+
+    async def mark_clean(self, states: list[CartState]) -> None:
+        """Clear the dirty flag of carts that have not changed since these states were flushed."""
+
+    async def remove(self, user_id: int) -> None:
+        """Forget a cart, including any unflushed writes."""
+
+    async def evict(self) -> int:
+        """Drop clean carts that are idle or beyond capacity; return how many were dropped."""
+
+    def over_capacity(self) -> bool:
+        """Whether the store holds more carts than it should, so a flush should run early."""
+
+    async def close(self) -> None:
+        """Release connections held by the store."""
+
+
+class InMemoryCartStore:
+    """Process-local store, for single-replica deployments or sticky routing by user."""
+
+    def __init__(self, max_entries: int, idle_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        # user_id -> (state, last access), least recently used first.
+        self._entries: OrderedDict[int, tuple[CartState, float]] = OrderedDict()
+        self._dirty: set[int] = set()
+
+    def _touch(self, state: CartState) -> None:
+        self._entries[state.user_id] = (state, time.monotonic())
+        self._entries.move_to_end(state.user_id)
+
+    async def get(self, user_id: int) -> CartState | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        self._touch(entry[0])
+        return entry[0]
+
+    async def load(self, state: CartState) -> CartState:
+        held = await self.get(state.user_id)
+        if held is not None:
+            return held
+        self._touch(state)
+        return state
+
+    async def put(self, state: CartState, expected_version: int) -> bool:
+        entry = self._entries.get(state.user_id)
+        if entry is not None and entry[0].version != expected_version:
+            return False
+        self._touch(state)
+        self._dirty.add(state.user_id)
+        return True
+
+    async def dirty(self, limit: int) -> list[CartState]:
+        states = []
+        for user_id in self._dirty:
+            states.append(self._entries[user_id][0])
+            if len(states) >= limit:
+                break
+        return states
+
+    async def is_dirty(self, user_id: int) -> bool:
+        return user_id in self._dirty
+
+    async def mark_clean(self, states: list[CartState]) -> None:
+        for state in states:
+            entry = self._entries.get(state.user_id)
+            if entry is None or entry[0].version == state.version:
+                self._dirty.discard(state.user_id)
+
+    async def remove(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+        self._dirty.discard(user_id)
+
+    async def evict(self) -> int:
+        cutoff = time.monotonic() - self.idle_seconds
+        excess = len(self._entries) - self.max_entries
+        evicted = []
+        for user_id, (_, last_access) in self._entries.items():
+            if last_access > cutoff and excess <= 0:
+                break
+            if user_id not in self._dirty:
+                evicted.append(user_id)
+                excess -= 1
+        for user_id in evicted:
+            del self._entries[user_id]
+        return len(evicted)
+
+    def over_capacity(self) -> bool:
+        return len(self._entries) > self.max_entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def close(self) -> None:
+        pass
+
+
+# KEYS: cart hash, dirty set. ARGV: expected version, new version, state, user id.
+_PUT = """
+local held = redis.call('HGET', KEYS[1], 'version')
+if held and held ~= ARGV[1] then return 0 end
+redis.call('HSET', KEYS[1], 'version', ARGV[2], 'state', ARGV[3])
+redis.call('PERSIST', KEYS[1])
+redis.call('SADD', KEYS[2], ARGV[4])
+return 1
+"""
+
+# KEYS: cart hash. ARGV: version, state, idle seconds.
+_LOAD = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'version', ARGV[1], 'state', ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return redis.call('HGET', KEYS[1], 'state')
+"""
+
+# KEYS: dirty set, then one cart hash per flushed cart. ARGV: idle seconds, then (user id, version) pairs.
+_MARK_CLEAN = """
+for i = 2, #KEYS do
+    local user_id, version = ARGV[2 * i - 2], ARGV[2 * i - 1]
+    if redis.call('HGET', KEYS[i], 'version') == version then
+        redis.call('SREM', KEYS[1], user_id)
+        redis.call('EXPIRE', KEYS[i], ARGV[1])
+    end
+end
+return 0
+"""
+
+
+class RedisCartStore:
+    """Store shared by every replica through a Redis-compatible server.
+
+    Clean carts carry a key TTL of `idle_seconds`, so Redis does the idle eviction;
+    dirty carts are persisted until a flush marks them clean.
+    """
+
+    def __init__(self, url: str, idle_seconds: float, prefix: str = "cart") -> None:
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:  # pragma: no cover - depends on the optional extra
+            raise RuntimeError("CART_HOT_TIER=redis requires the 'redis' package (pip install redis).") from exc
+
+        self.idle_seconds = max(1, int(idle_seconds))
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._put = self._redis.register_script(_PUT)
+        self._load = self._redis.register_script(_LOAD)
+        self._mark_clean = self._redis.register_script(_MARK_CLEAN)
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}:{user_id}"
+
+    @property
+    def _dirty_key(self) -> str:
+        return f"{self.prefix}:dirty"
+
+    async def get(self, user_id: int) -> CartState | None:
+        raw = await self._redis.hget(self._key(user_id), "state")
+        return CartState.from_json(raw) if raw is not None else None
+
+    async def load(self, state: CartState) -> CartState:
+        raw = await self._load(keys=[self._key(state.user_id)], args=[state.version, state.to_json(), self.idle_seconds])
+        return CartState.from_json(raw)
+
+    async def put(self, state: CartState, expected_version: int) -> bool:
+        stored = await self._put(
+            keys=[self._key(state.user_id), self._dirty_key],
+            args=[expected_version, state.version, state.to_json(), state.user_id],
+        )
+        return bool(stored)
+
+    async def dirty(self, limit: int) -> list[CartState]:
+        user_ids = [int(user_id) for user_id in await self._redis.srandmember(self._dirty_key, limit)]
+        if not user_ids:
+            return []
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.hget(self._key(user_id), "state")
+            raws = await pipe.execute()
+        return [CartState.from_json(raw) for raw in raws if raw is not None]
+
+    async def is_dirty(self, user_id: int) -> bool:
+        return bool(await self._redis.sismember(self._dirty_key, user_id))
+
+    async def mark_clean(self, states: list[CartState]) -> None:
+        if not states:
+            return
+        args: list = [self.idle_seconds]
+        for state in states:
+            args += [state.user_id, state.version]
+        await self._mark_clean(keys=[self._dirty_key, *(self._key(state.user_id) for state in states)], args=args)
+
+    async def remove(self, user_id: int) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(user_id))
+            pipe.srem(self._dirty_key, user_id)
+            await pipe.execute()
+
+    async def evict(self) -> int:
+        return 0
+
+    def over_capacity(self) -> bool:
+        return False
+
+    async def close(self) -> None:
+        await self._redis.aclose()
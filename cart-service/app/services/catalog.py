@@ -0,0 +1,195 @@
+"""Client for current product prices and stock from product-service.
+
+Prices come from `POST /products/batch` over a pooled keep-alive client. They, and
+products the catalog no longer has, are cached for `PRODUCT_CACHE_TTL_SECONDS` so
+revalidating many carts that share popular products does not hit product-service for
+each one. Stock is never cached: every lookup reads `GET /products/stock`, the ledger's
+snapshot plus pending movements, alongside the price call. Pass a `transport` (for
+example `httpx.ASGITransport(app=product_app)` or `httpx.MockTransport`) to run against
+a stub.
+
+The check is advisory; checkout reserves stock for real.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+import asyncio
+import os
+import time
+
+import httpx
+
+from app.schemas import CartLineCheck
+
+PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://localhost:8001")
+PRODUCT_SERVICE_TIMEOUT_SECONDS = float(os.getenv("PRODUCT_SERVICE_TIMEOUT_SECONDS", "2"))
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "5"))
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "10000"))
+# product-service accepts at most this many ids per `GET /products/stock`.
+STOCK_LOOKUP_CHUNK_SIZE = 1000
+
+
+class CatalogUnavailable(Exception):
+    """product-service could not be reached or answered with an error."""
+
+
+@dataclass(frozen=True)
+class ProductPrice:
+    product_id: int
+    price: int
+
+
+@dataclass(frozen=True)
+class ProductSnapshot:
+    product_id: int
+    price: int
+    stock: int
+
+
+class ProductCatalog:
+    def __init__(
+        self,
+        base_url: str = PRODUCT_SERVICE_URL,
+        transport: httpx.AsyncBaseTransport | None = None,
+        ttl_seconds: float = PRODUCT_CACHE_TTL_SECONDS,
+        max_entries: int = PRODUCT_CACHE_MAX_ENTRIES,
+        timeout: float = PRODUCT_SERVICE_TIMEOUT_SECONDS,
+    ) -> None:
+        self.base_url = base_url
+        self.transport = transport
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.requests = 0
+        # product_id -> (expires at, price or None when the product does not exist)
+        self._cache: dict[int, tuple[float, ProductPrice | None]] = {}
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the running event loop, and again after `aclose`.
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                transport=self.transport,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+
+    def _remember(self, product_id: int, price: ProductPrice | None, now: float) -> None:
+        if len(self._cache) >= self.max_entries:
+            self._cache = {key: entry for key, entry in self._cache.items() if entry[0] > now}
+            if len(self._cache) >= self.max_entries:
+                self._cache.clear()
+        self._cache[product_id] = (now + self.ttl_seconds, price)
+
+    async def _prices(self, product_ids: list[int]) -> dict[int, ProductPrice | None]:
+        now = time.monotonic()
+        found: dict[int, ProductPrice | None] = {}
+        misses = []
+        for product_id in product_ids:
+            entry = self._cache.get(product_id)
+            if entry is not None and entry[0] > now:
+                found[product_id] = entry[1]
+            else:
+                misses.append(product_id)
+        if not misses:
+            return found
+
+        self.requests += 1
+        response = await self.client.post("/products/batch", json={"ids": misses})
+        response.raise_for_status()
+        body = response.json()
+        for product in body["items"]:
+            price = ProductPrice(product_id=product["id"], price=product["price"])
+            found[price.product_id] = price
+            self._remember(price.product_id, price, now)
+        for product_id in body["missing"]:
+            found[product_id] = None
+            self._remember(product_id, None, now)
+        return found
+
+    async def _stock(self, product_ids: list[int]) -> dict[int, int]:
+        chunks = [
+            product_ids[start : start + STOCK_LOOKUP_CHUNK_SIZE]
+            for start in range(0, len(product_ids), STOCK_LOOKUP_CHUNK_SIZE)
+        ]
+        self.requests += len(chunks)
+        responses = await asyncio.gather(
+            *(self.client.get("/products/stock", params={"ids": chunk}) for chunk in chunks)
+        )
+        stock = {}
+        for response in responses:
+            response.raise_for_status()
+            for item in response.json()["items"]:
+                stock[item["product_id"]] = item["stock"]
+        return stock
+
+    async def lookup(self, product_ids: list[int]) -> dict[int, ProductSnapshot | None]:
+        """Return each product's price and available stock, or None for products the catalog does not have."""
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return {}
+        try:
+            prices, stock = await asyncio.gather(self._prices(product_ids), self._stock(product_ids))
+        except httpx.HTTPError as exc:
+            raise CatalogUnavailable(str(exc)) from exc
+
+        found: dict[int, ProductSnapshot | None] = {}
+        for product_id in product_ids:
+            price = prices.get(product_id)
+            if price is None or product_id not in stock:
+                # Gone from one of the two reads: treat it as missing rather than guessing.
+                found[product_id] = None
+            else:
+                found[product_id] = ProductSnapshot(product_id=product_id, price=price.price, stock=stock[product_id])
+        return found
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def check_lines(
+    lines: Iterable[tuple[int, int, int]], snapshots: dict[int, ProductSnapshot | None]
+) -> list[CartLineCheck]:
+    """Compare (product_id, quantity, unit_price) lines with the catalog, repricing lines whose price moved.
+
+    A line is `unavailable` when the product is gone or out of stock and `insufficient_stock`
+    when less than its quantity is left; either way its price is still brought up to date.
+    """
+    checks = []
+    for product_id, quantity, unit_price in lines:
+        snapshot = snapshots.get(product_id)
+        if snapshot is None:
+            checks.append(CartLineCheck(product_id=product_id, status="unavailable", quantity=quantity, unit_price=unit_price))
+            continue
+
+        repriced = snapshot.price != unit_price
+        if snapshot.stock <= 0:
+            line_status = "unavailable"
+        elif snapshot.stock < quantity:
+            line_status = "insufficient_stock"
+        else:
+            line_status = "price_changed" if repriced else "ok"
+        checks.append(
+            CartLineCheck(
+                product_id=product_id,
+                status=line_status,
+                quantity=quantity,
+                unit_price=snapshot.price,
+                previous_unit_price=unit_price if repriced else None,
+                available_stock=max(snapshot.stock, 0),
+            )
+        )
+    return checks
+
+
+product_catalog = ProductCatalog()
+
+
+def get_product_catalog() -> ProductCatalog:
+    """Dependency for routes, overridable in tests with a catalog built on a stub transport."""
+    return product_catalog
@@ -0,0 +1,147 @@
+"""Expiry of abandoned carts.
+
+Carts untouched for `CART_TTL_SECONDS` are deleted with their items in batches of
+`CART_EXPIRY_BATCH_SIZE`, oldest first, walking the (updated_at, id) index. Each
+batch is its own short transaction and the job sleeps between batches to stay under
+`CART_EXPIRY_MAX_ROWS_PER_SECOND`, so a large backlog drains over several seconds
+instead of contending with foreground writes in one long delete.
+
+With the hot tier on, each batch holds its carts' locks and the flush lock while it
+deletes, and skips carts the store holds with unflushed or newer writes: the row's
+`updated_at` trails the store by up to one flush, so it alone cannot tell a cart is
+abandoned.
+"""
+
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import SessionLocal
+from app.models import Cart, CartItem
+from app.services.hot_tier import cart_tier
+
+logger = logging.getLogger(__name__)
+
+CART_TTL_SECONDS = float(os.getenv("CART_TTL_SECONDS", str(30 * 24 * 3600)))
+CART_EXPIRY_INTERVAL_SECONDS = float(os.getenv("CART_EXPIRY_INTERVAL_SECONDS", "300"))
+CART_EXPIRY_BATCH_SIZE = int(os.getenv("CART_EXPIRY_BATCH_SIZE", "500"))
+CART_EXPIRY_MAX_ROWS_PER_SECOND = float(os.getenv("CART_EXPIRY_MAX_ROWS_PER_SECOND", "5000"))
+
+
+@dataclass
+class ExpiryReport:
+    carts: int = 0
+    items: int = 0
+    batches: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.carts + self.items
+
+
+async def _expire_batch(
+    db: AsyncSession, cutoff: datetime, batch_size: int, after: tuple[datetime, int] | None
+) -> tuple[list[int], int, tuple[datetime, int] | None]:
+    """Delete one batch of expired carts.
+
+    Returns the deleted carts' user ids, the number of items removed, and the (updated_at, id)
+    position to continue from, or None when no expired carts are left past `after`.
+    """
+    stmt = select(Cart.id, Cart.user_id, Cart.updated_at).where(Cart.updated_at < cutoff)
+    if after is not None:
+        stmt = stmt.where(or_(Cart.updated_at > after[0], and_(Cart.updated_at == after[0], Cart.id > after[1])))
+    candidates = (await db.execute(stmt.order_by(Cart.updated_at, Cart.id).limit(batch_size))).all()
+    # End the read before waiting on tier locks, which a flush may hold while it writes these rows.
+    await db.commit()
+    if not candidates:
+        return [], 0, None
+    position = (candidates[-1].updated_at, candidates[-1].id) if len(candidates) == batch_size else None
+
+    async with cart_tier.locked(row.user_id for row in candidates) if cart_tier is not None else nullcontext():
+        cart_ids = [
+            row.id for row in candidates if cart_tier is None or await cart_tier.is_expired(row.user_id, cutoff)
+        ]
+        if not cart_ids:
+            return [], 0, position
+        # Re-check the age under the row lock; SKIP LOCKED leaves carts a request is writing
+        # right now for the next run (ignored on SQLite).
+        rows = (
+            await db.execute(
+                select(Cart.id, Cart.user_id)
+                .where(Cart.id.in_(cart_ids), Cart.updated_at < cutoff)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not rows:
+            await db.commit()
+            return [], 0, position
+
+        cart_ids = [cart_id for cart_id, _ in rows]
+        user_ids = [user_id for _, user_id in rows]
+        if cart_tier is not None:
+            for user_id in user_ids:
+                await cart_tier.store.remove(user_id)
+        # Items go first and explicitly: SQLite does not enforce the ON DELETE CASCADE.
+        items = await db.execute(delete(CartItem).where(CartItem.cart_id.in_(cart_ids)))
+        await db.execute(delete(Cart).where(Cart.id.in_(cart_ids)))
+        await db.commit()
+    return user_ids, items.rowcount, position
+
+
+async def expire_carts(
+    db: AsyncSession,
+    ttl_seconds: float = CART_TTL_SECONDS,
+    batch_size: int = CART_EXPIRY_BATCH_SIZE,
+    max_rows_per_second: float = CART_EXPIRY_MAX_ROWS_PER_SECOND,
+) -> ExpiryReport:
+    """Delete every cart not updated within `ttl_seconds`, batch by batch, and report what was reclaimed."""
+    started = time.perf_counter()
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+    report = ExpiryReport()
+    position = None
+
+    while True:
+        batch_started = time.perf_counter()
+        # Walk past carts that were skipped rather than deleted, so they are not selected again.
+        user_ids, items, position = await _expire_batch(db, cutoff, batch_size, position)
+        if user_ids:
+            report.carts += len(user_ids)
+            report.items += items
+            report.batches += 1
+        if position is None:
+            break
+        if max_rows_per_second > 0:
+            budget = (len(user_ids) + items) / max_rows_per_second
+            await asyncio.sleep(max(0.0, budget - (time.perf_counter() - batch_started)))
+
+    report.elapsed_seconds = round(time.perf_counter() - started, 3)
+    return report
+
+
+async def run_cart_expiry(interval: float = CART_EXPIRY_INTERVAL_SECONDS) -> None:
+    """Expire abandoned carts every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with SessionLocal() as db:
+                report = await expire_carts(db)
+        except SQLAlchemyError:
+            logger.exception("Cart expiry failed; retrying on the next run.")
+            continue
+        logger.info(
+            "Expired %d carts and %d items (%d rows) in %d batches, %.3fs.",
+            report.carts,
+            report.items,
+            report.rows,
+            report.batches,
+            report.elapsed_seconds,
+        )
@@ -0,0 +1,315 @@
+"""Write-behind hot tier for active carts.
+
+With `CART_HOT_TIER` set, item writes land in a `CartStore` and return
+immediately; a background flusher copies dirty carts to `carts`/`cart_items`
+every `CART_FLUSH_INTERVAL_SECONDS`, one transaction per batch. Fifty clicks on
+one cart between flushes cost one cart write, so database writes scale with active
+carts rather than with requests. The database lags the store by at most one flush
+interval plus the flush itself, and everything dirty is flushed on shutdown.
+
+Creating and deleting carts still go straight to the database: a cart needs its
+row id before it can be served, and deletes must not be resurrected by a flush.
+"""
+
+from collections.abc import AsyncIterator, Iterable
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timezone
+from weakref import WeakValueDictionary
+import asyncio
+import logging
+import os
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.db import SessionLocal
+from app.models import Cart, CartItem
+from app.schemas import CartItemAddOperation, CartItemOperation, CartItemRemoveOperation
+from app.services.cart_store import CartLine, CartState, CartStore, InMemoryCartStore, RedisCartStore
+
+logger = logging.getLogger(__name__)
+
+CART_HOT_TIER = os.getenv("CART_HOT_TIER", "").lower()
+CART_REDIS_URL = os.getenv("CART_REDIS_URL", "redis://localhost:6379/0")
+CART_FLUSH_INTERVAL_SECONDS = float(os.getenv("CART_FLUSH_INTERVAL_SECONDS", "1"))
+CART_FLUSH_BATCH_SIZE = int(os.getenv("CART_FLUSH_BATCH_SIZE", "500"))
+CART_HOT_MAX_ENTRIES = int(os.getenv("CART_HOT_MAX_ENTRIES", "10000"))
+CART_IDLE_SECONDS = float(os.getenv("CART_IDLE_SECONDS", "900"))
+
+
+class CartItemNotFound(LookupError):
+    def __init__(self, index: int, product_id: int) -> None:
+        super().__init__(product_id)
+        self.index = index
+        self.product_id = product_id
+
+
+class CartVersionConflict(Exception):
+    def __init__(self, version: int | None) -> None:
+        super().__init__(version)
+        self.version = version
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _state_from_row(cart: Cart) -> CartState:
+    return CartState(
+        cart_id=cart.id,
+        user_id=cart.user_id,
+        version=cart.version,
+        created_at=cart.created_at,
+        updated_at=cart.updated_at,
+        lines={
+            item.product_id: CartLine(item.product_id, item.quantity, int(item.unit_price), item.created_at, item.updated_at)
+            for item in cart.items
+        },
+    )
+
+
+def apply_operations(state: CartState, operations: Iterable[CartItemOperation], replace: bool = False) -> None:
+    """Apply add, set and remove operations to a cart state in order."""
+    now = _now()
+    if replace:
+        state.lines.clear()
+    for index, operation in enumerate(operations):
+        line = state.lines.get(operation.product_id)
+        if isinstance(operation, CartItemAddOperation):
+            if line is None:
+                state.lines[operation.product_id] = CartLine(
+                    operation.product_id, operation.quantity, operation.unit_price, now, now
+                )
+            else:
+                line.quantity += operation.quantity
+                line.unit_price = operation.unit_price
+                line.updated_at = now
+            continue
+
+        if line is None:
+            raise CartItemNotFound(index, operation.product_id)
+        if isinstance(operation, CartItemRemoveOperation):
+            del state.lines[operation.product_id]
+            continue
+        if operation.quantity is not None:
+            line.quantity = operation.quantity
+        if operation.unit_price is not None:
+            line.unit_price = operation.unit_price
+        line.updated_at = now
+
+
+class HotCartTier:
+    """Serve cart reads and item writes from a store and flush them to the database behind the request."""
+
+    def __init__(self, store: CartStore, batch_size: int = CART_FLUSH_BATCH_SIZE) -> None:
+        self.store = store
+        self.batch_size = batch_size
+        self.flushed_carts = 0
+        self.flushes = 0
+        self._locks: WeakValueDictionary[int, asyncio.Lock] = WeakValueDictionary()
+        self._flush_lock = asyncio.Lock()
+        # Created by `run`, so it belongs to the loop the flusher runs on.
+        self._wake: asyncio.Event | None = None
+
+    def _lock(self, user_id: int) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def read(self, db: AsyncSession, user_id: int) -> CartState | None:
+        """Return the current cart, loading it into the store on a miss."""
+        state = await self.store.get(user_id)
+        if state is not None:
+            return state
+        stmt = select(Cart).options(selectinload(Cart.items)).where(Cart.user_id == user_id)
+        cart = (await db.execute(stmt)).scalar_one_or_none()
+        if cart is None:
+            return None
+        return await self.store.load(_state_from_row(cart))
+
+    async def apply(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        operations: Iterable[CartItemOperation],
+        expected: set[int] | None = None,
+        replace: bool = False,
+        create: bool = False,
+    ) -> CartState | None:
+        """Apply item operations as one new cart version; None when the cart does not exist and `create` is False."""
+        async with self._lock(user_id):
+            state = await self.read(db, user_id)
+            if state is None:
+                if not create:
+                    return None
+                if expected is not None:
+                    raise CartVersionConflict(None)
+                cart = Cart(user_id=user_id, items=[])
+                db.add(cart)
+                await db.commit()
+                await db.refresh(cart, ["created_at", "updated_at"])
+                state = await self.store.load(_state_from_row(cart))
+
+            if expected is not None and state.version not in expected:
+                raise CartVersionConflict(state.version)
+
+            updated = state.copy()
+            apply_operations(updated, operations, replace)
+            updated.version += 1
+            updated.updated_at = _now()
+            if not await self.store.put(updated, state.version):
+                # Another replica sharing the store wrote this cart first.
+                raise CartVersionConflict(None)
+
+        if self._wake is not None and self.store.over_capacity():
+            self._wake.set()
+        return updated
+
+    async def delete(self, db: AsyncSession, user_id: int, expected: set[int] | None = None) -> bool:
+        """Delete the cart row and its hot state, discarding unflushed writes. False when there is no cart."""
+        async with self._lock(user_id):
+            state = await self.read(db, user_id)
+            if state is None:
+                return False
+            if expected is not None and state.version not in expected:
+                raise CartVersionConflict(state.version)
+            # Holding the flush lock keeps an in-flight flush from re-inserting items after the delete.
+            async with self._flush_lock:
+                await self.store.remove(user_id)
+                await db.execute(delete(CartItem).where(CartItem.cart_id == state.cart_id))
+                await db.execute(delete(Cart).where(Cart.id == state.cart_id))
+                await db.commit()
+        return True
+
+    @asynccontextmanager
+    async def locked(self, user_ids: Iterable[int]) -> AsyncIterator[None]:
+        """Hold these carts' locks and the flush lock, so neither requests nor a flush write them meanwhile."""
+        async with AsyncExitStack() as stack:
+            for user_id in sorted(set(user_ids)):
+                await stack.enter_async_context(self._lock(user_id))
+            await stack.enter_async_context(self._flush_lock)
+            yield
+
+    async def is_expired(self, user_id: int, cutoff: datetime) -> bool:
+        """Whether the store has nothing newer than `cutoff` for this cart. Call it inside `locked`."""
+        state = await self.store.get(user_id)
+        if state is None:
+            return True
+        if await self.store.is_dirty(user_id):
+            return False
+        updated_at = state.updated_at
+        if updated_at.tzinfo is None:
+            # SQLite hands back naive timestamps; they are stored in UTC.
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return updated_at < cutoff
+
+    async def _write(self, states: list[CartState]) -> None:
+        carts = Cart.__table__
+        items = CartItem.__table__
+        async with SessionLocal() as db:
+            # Lock the rows first, in id order, so replicas flushing the same carts through a shared
+            # store queue up here and the later one sees the version the earlier one wrote.
+            held = dict(
+                (
+                    await db.execute(
+                        select(carts.c.id, carts.c.version)
+                        .where(carts.c.id.in_([state.cart_id for state in states]))
+                        .order_by(carts.c.id)
+                        .with_for_update()
+                    )
+                ).all()
+            )
+            # Skip carts deleted meanwhile and states another replica has already written or overtaken.
+            states = [state for state in states if state.cart_id in held and held[state.cart_id] < state.version]
+            if not states:
+                await db.commit()
+                return
+            cart_ids = [state.cart_id for state in states]
+            await db.execute(
+                update(carts)
+                .where((carts.c.id == bindparam("b_id")) & (carts.c.version < bindparam("b_version")))
+                .values(
+                    version=bindparam("b_version"),
+                    updated_at=bindparam("b_updated_at"),
+                    item_count=bindparam("b_item_count"),
+                    subtotal=bindparam("b_subtotal"),
+                ),
+                [
+                    {
+                        "b_id": state.cart_id,
+                        "b_version": state.version,
+                        "b_updated_at": state.updated_at,
+                        "b_item_count": state.item_count,
+                        "b_subtotal": state.subtotal,
+                    }
+                    for state in states
+                ],
+            )
+            # Rewriting a cart's lines is cheaper than diffing them, and carts are small.
+            await db.execute(delete(items).where(items.c.cart_id.in_(cart_ids)))
+            rows = [
+                {
+                    "cart_id": state.cart_id,
+                    "product_id": line.product_id,
+                    "quantity": line.quantity,
+                    "unit_price": line.unit_price,
+                    "created_at": line.created_at,
+                    "updated_at": line.updated_at,
+                }
+                for state in states
+                for line in state.lines.values()
+            ]
+            if rows:
+                await db.execute(insert(items), rows)
+            await db.commit()
+
+    async def flush(self) -> int:
+        """Write every dirty cart to the database in batches. Returns the number of carts written."""
+        written = 0
+        async with self._flush_lock:
+            while states := await self.store.dirty(self.batch_size):
+                await self._write(states)
+                await self.store.mark_clean(states)
+                written += len(states)
+                self.flushes += 1
+                if len(states) < self.batch_size:
+                    break
+        self.flushed_carts += written
+        return written
+
+    async def run(self, interval: float = CART_FLUSH_INTERVAL_SECONDS) -> None:
+        """Flush and evict every `interval` seconds, or sooner when the store fills up, until cancelled."""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                await self.store.evict()
+            except SQLAlchemyError:
+                logger.exception("Cart flush failed; retrying on the next run.")
+
+    async def close(self) -> None:
+        """Flush everything still dirty and release the store."""
+        await self.flush()
+        await self.store.close()
+
+
+def build_hot_tier() -> HotCartTier | None:
+    """Create the tier configured by `CART_HOT_TIER` ("memory" or "redis"), or None when it is off."""
+    if CART_HOT_TIER in ("", "off"):
+        return None
+    if CART_HOT_TIER == "memory":
+        return HotCartTier(InMemoryCartStore(CART_HOT_MAX_ENTRIES, CART_IDLE_SECONDS))
+    if CART_HOT_TIER == "redis":
+        return HotCartTier(RedisCartStore(CART_REDIS_URL, CART_IDLE_SECONDS))
+    raise ValueError(f"Unknown CART_HOT_TIER {CART_HOT_TIER!r}; expected 'memory', 'redis' or 'off'.")
+
+
+cart_tier = build_hot_tier()
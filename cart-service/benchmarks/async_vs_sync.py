@@ -0,0 +1,144 @@
+"""Compare sync and async cart handlers under high concurrency.
+
+The async side is the real application with its database dependency pointed at a
+scratch SQLite file. The sync side mirrors `get_cart` as it was written before the
+async migration: a `def` handler on a blocking Session, which FastAPI runs in its
+threadpool. `--db-latency-ms` adds a fixed delay to every statement on both sides to
+stand in for a networked database; that is where the threadpool ceiling shows.
+
+Usage: python -m benchmarks.async_vs_sync --requests 4000 --concurrency 200 --db-latency-ms 5
+"""
+
+from typing import Annotated, Generator
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+from sqlalchemy.util import await_only
+
+from app import create_app
+from app.db import get_db
+from app.db.session import to_async_url
+from app.models import Base, Cart, CartItem
+from app.schemas import CartRead
+
+
+def _seed(url: str, carts: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        for user_id in range(1, carts + 1):
+            db.add(Cart(user_id=user_id, items=[CartItem(product_id=p, quantity=1, unit_price=100) for p in range(1, 6)]))
+        db.commit()
+    engine.dispose()
+
+
+def build_sync_app(url: str, pool_size: int, latency: float) -> FastAPI:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=pool_size, max_overflow=0)
+    if latency:
+        @event.listens_for(engine, "before_cursor_execute")
+        def _delay(*_args) -> None:
+            time.sleep(latency)
+
+    SyncSession = sessionmaker(bind=engine, autoflush=False)
+
+    def get_sync_db() -> Generator[Session, None, None]:
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/carts/{user_id}", response_model=CartRead)
+    def get_cart(user_id: int, db: Annotated[Session, Depends(get_sync_db)]) -> CartRead:
+        stmt = select(Cart).options(selectinload(Cart.items)).where(Cart.user_id == user_id)
+        return db.execute(stmt).scalar_one()
+
+    return app
+
+
+def build_async_app(url: str, pool_size: int, latency: float) -> FastAPI:
+    engine = create_async_engine(to_async_url(url), pool_size=pool_size, max_overflow=0)
+    if latency:
+        # Runs inside SQLAlchemy's greenlet, so the delay suspends the request instead of blocking the loop.
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _delay(*_args) -> None:
+            await_only(asyncio.sleep(latency))
+
+    AsyncSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = create_app()
+    app.dependency_overrides[get_db] = get_async_db
+    return app
+
+
+async def _drive(app: FastAPI, requests: int, concurrency: int, carts: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(n: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(f"/carts/{n % carts + 1}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(requests)))
+        return time.perf_counter() - started, latencies
+
+
+def _report(label: str, elapsed: float, latencies: list[float]) -> None:
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:<6} {len(latencies) / elapsed:9.1f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--carts", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, help="connections per engine (default: --concurrency)")
+    parser.add_argument("--database-url", help="sync URL of a scratch database to seed (default: a temporary SQLite file)")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    # A sync request holds its connection until its cleanup gets a threadpool slot, so a
+    # pool smaller than the in-flight requests can starve itself; size it to match.
+    args.pool_size = args.pool_size or args.concurrency
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        _seed(url, args.carts)
+        latency = args.db_latency_ms / 1000
+        print(f"{args.requests} GET /carts/{{user_id}} requests, concurrency {args.concurrency}, "
+              f"pool {args.pool_size}, {args.db_latency_ms} ms per statement")
+        for label, app in (
+            ("sync", build_sync_app(url, args.pool_size, latency)),
+            ("async", build_async_app(url, args.pool_size, latency)),
+        ):
+            elapsed, latencies = asyncio.run(_drive(app, args.requests, args.concurrency, args.carts))
+            _report(label, elapsed, latencies)
+
+
+if __name__ == "__main__":
+    main()
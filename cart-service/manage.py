@@ -0,0 +1,46 @@
+"""Maintenance commands for the cart service.
+
+Usage: python manage.py <command>
+"""
+
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+
+
+async def _expire_carts() -> None:
+    from app.db import SessionLocal, engine
+    from app.models import Base
+    from app.services import expire_carts
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        report = await expire_carts(db)
+    await engine.dispose()
+    print(
+        f"Expired {report.carts} carts and {report.items} items ({report.rows} rows) "
+        f"in {report.batches} batches, {report.elapsed_seconds}s."
+    )
+
+
+def expire_carts() -> None:
+    asyncio.run(_expire_carts())
+
+
+COMMANDS = {
+    "expire-carts": expire_carts,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cart service maintenance commands.")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    load_dotenv()
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
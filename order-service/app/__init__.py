@@ -1,15 +1,38 @@
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from dotenv import load_dotenv
+import asyncio
 from app.models import Base
-from app.db import engine
+from app.db import check_upsert_support, engine
 from app.api import api_router
+from app.services import (
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS,
+    ORDER_OUTBOX_INTERVAL_SECONDS,
+    cart_client,
+    order_outbox,
+    product_client,
+    run_idempotency_purge,
+)
 
 from fastapi import FastAPI
 
 @asynccontextmanager
 async def lifespan(_:FastAPI):
+    """Ensure tables exist, publish order events and purge expired Idempotency-Keys while serving."""
+    check_upsert_support(engine)
     Base.metadata.create_all(bind=engine)
+
+    tasks = []
+    if ORDER_OUTBOX_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(order_outbox.run(ORDER_OUTBOX_INTERVAL_SECONDS)))
+    if IDEMPOTENCY_PURGE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_idempotency_purge(IDEMPOTENCY_PURGE_INTERVAL_SECONDS)))
     yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    cart_client.close()
+    product_client.close()
     
 def create_app() -> FastAPI:
     load_dotenv()
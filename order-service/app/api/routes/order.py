@@ -1,18 +1,76 @@
+from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session, raiseload, selectinload
 
 from app.db import get_db
 from app.models import Order, OrderItem
-from app.schemas import OrderCreate, OrderItemCreate, OrderItemUpdate, OrderRead, OrderUpdate
+from app.schemas import (
+    CheckoutRequest,
+    OrderCreate,
+    OrderItemCreate,
+    OrderItemUpdate,
+    OrderPage,
+    OrderRead,
+    OrderStatusTransition,
+    OrderTransitionResult,
+    OrderUpdate,
+    OutboxStats,
+    UserOrderSummaryRead,
+)
+from app.services import (
+    CartClient,
+    ExportFormat,
+    OrderFilters,
+    OutboxDispatcher,
+    ProductClient,
+    apply_filters,
+    apply_keyset,
+    apply_summary_delta,
+    can_transition,
+    checkout_cart,
+    claim_idempotency_key,
+    complete_idempotency_key,
+    counted_spend,
+    encode_cursor,
+    enqueue_order_event,
+    get_cart_client,
+    get_order_outbox,
+    get_product_client,
+    read_order_summary,
+    record_order_placed,
+    record_order_removed,
+    refresh_order_totals,
+    release_idempotency_key,
+    renew_idempotency_key,
+    request_hash,
+    stream_export,
+    transition_orders,
+)
 
 DB_Session = Annotated[Session, Depends(get_db)]
+Carts = Annotated[CartClient, Depends(get_cart_client)]
+Products = Annotated[ProductClient, Depends(get_product_client)]
+Outbox = Annotated[OutboxDispatcher, Depends(get_order_outbox)]
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+MAX_PAGE_SIZE = 200
+
+PageLimit = Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)]
+PageCursor = Annotated[str | None, Query(description="The next_after cursor of the previous page, for the same filters.")]
+StatusFilter = Annotated[str | None, Query(alias="status", min_length=1, max_length=20)]
+CreatedFrom = Annotated[datetime | None, Query(description="Only orders created at or after this time.")]
+CreatedTo = Annotated[datetime | None, Query(description="Only orders created before this time.")]
+IdempotencyKeyHeader = Annotated[
+    str | None,
+    Header(alias="Idempotency-Key", min_length=1, max_length=255, description="Retries with the same key replay the first response."),
+]
+
 
 def _order_query(user_id: int | None = None, order_id: int | None = None):
     stmt = select(Order).options(selectinload(Order.items))
@@ -25,22 +83,26 @@ def _order_query(user_id: int | None = None, order_id: int | None = None):
     return stmt.order_by(Order.created_at.desc())
 
 
-def get_orders_or_404(user_id: int, db: Session) -> list[Order]:
+def _order_page(db: Session, filters: OrderFilters, limit: int, after: str | None) -> OrderPage:
+    """Return one keyset page of orders matching the filters, newest first."""
+    try:
+        # Listings show stored totals only; raiseload keeps items from being joined or loaded.
+        stmt = apply_keyset(apply_filters(select(Order).options(raiseload(Order.items)), filters), after)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.") from exc
+
     try:
-        orders = db.execute(_order_query(user_id=user_id)).unique().scalars().all()
+        orders = list(db.execute(stmt.limit(limit + 1)).scalars().all())
     except SQLAlchemyError as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve orders.",
         ) from exc
 
-    if not orders:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No orders found for the user.",
-        )
-
-    return orders
+    # The extra row only tells us whether another page exists.
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+    return OrderPage(items=orders, next_after=encode_cursor(orders[-1]) if has_more else None)
 
 
 def get_one_order_or_404(order_id: int, db: Session) -> Order:
@@ -58,10 +120,6 @@ def get_one_order_or_404(order_id: int, db: Session) -> Order:
     return order
 
 
-def reload_orders(user_id: int, db: Session) -> list[Order]:
-    return db.execute(_order_query(user_id=user_id)).unique().scalars().all()
-
-
 def reload_one_order(order_id: int, db: Session) -> Order:
     return db.execute(_order_query(order_id=order_id)).unique().scalar_one()
 
@@ -74,21 +132,86 @@ def _materialize_item(payload: OrderItemCreate) -> OrderItem:
     )
 
 
-@router.get("", summary="List orders", response_model=list[OrderRead])
-def list_orders(db: DB_Session) -> list[OrderRead]:
+@router.get("", summary="List orders", response_model=OrderPage)
+def list_orders(
+    db: DB_Session,
+    limit: PageLimit = 50,
+    after: PageCursor = None,
+    order_status: StatusFilter = None,
+    created_from: CreatedFrom = None,
+    created_to: CreatedTo = None,
+) -> OrderPage:
+    """Return one page of all orders, newest first, optionally filtered by status and creation time."""
+    filters = OrderFilters(status=order_status, created_from=created_from, created_to=created_to)
+    return _order_page(db, filters, limit, after)
+
+
+@router.get("/outbox/stats", summary="Order event delivery backlog and counters", response_model=OutboxStats)
+def get_outbox_stats(db: DB_Session, dispatcher: Outbox) -> OutboxStats:
     try:
-        result = db.execute(_order_query())
-        return result.unique().scalars().all()
+        return OutboxStats(**dispatcher.stats(db))
     except SQLAlchemyError as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve orders.",
+            detail="Failed to retrieve outbox stats.",
         ) from exc
 
 
-@router.get("/users/{user_id}", summary="List orders for a user", response_model=list[OrderRead])
-def list_orders_for_user(user_id: int, db: DB_Session) -> list[OrderRead]:
-    return get_orders_or_404(user_id, db)
+@router.get("/users/{user_id}/summary", summary="Get a user's order totals", response_model=UserOrderSummaryRead)
+def get_user_order_summary(user_id: int, db: DB_Session) -> UserOrderSummaryRead:
+    try:
+        summary = read_order_summary(db, user_id)
+    except SQLAlchemyError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve order summary.",
+        ) from exc
+
+    if summary is None:
+        return UserOrderSummaryRead(user_id=user_id)
+    return summary
+
+
+@router.get("/users/{user_id}", summary="List orders for a user", response_model=OrderPage)
+def list_orders_for_user(
+    user_id: int,
+    db: DB_Session,
+    limit: PageLimit = 50,
+    after: PageCursor = None,
+    order_status: StatusFilter = None,
+    created_from: CreatedFrom = None,
+    created_to: CreatedTo = None,
+) -> OrderPage:
+    """Return one page of a user's order history, newest first."""
+    filters = OrderFilters(user_id=user_id, status=order_status, created_from=created_from, created_to=created_to)
+    page = _order_page(db, filters, limit, after)
+    if not page.items and after is None and filters == OrderFilters(user_id=user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No orders found for the user.",
+        )
+    return page
+
+
+@router.get("/export", summary="Stream orders and items for a date range")
+def export_orders(
+    created_from: Annotated[datetime, Query(description="Orders created at or after this time.")],
+    created_to: Annotated[datetime, Query(description="Orders created before this time.")],
+    output: Annotated[ExportFormat, Query(alias="format")] = "csv",
+    order_status: StatusFilter = None,
+    user_id: Annotated[int | None, Query(gt=0)] = None,
+) -> StreamingResponse:
+    """Stream one row per order item, oldest order first, as CSV or NDJSON."""
+    if created_from >= created_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="created_from must be before created_to.")
+
+    filters = OrderFilters(user_id=user_id, status=order_status, created_from=created_from, created_to=created_to)
+    filename = f"orders-{created_from:%Y%m%d}-{created_to:%Y%m%d}.{output}"
+    return StreamingResponse(
+        stream_export(filters, output),
+        media_type="text/csv" if output == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/{order_id}", summary="Retrieve an order", response_model=OrderRead)
@@ -97,36 +220,101 @@ def get_order(order_id: int, db: DB_Session) -> OrderRead:
 
 
 @router.post("", summary="Create an order", status_code=status.HTTP_201_CREATED, response_model=OrderRead)
-def create_order(payload: OrderCreate, db: DB_Session) -> OrderRead:
+def create_order(payload: OrderCreate, db: DB_Session, idempotency_key: IdempotencyKeyHeader = None) -> OrderRead:
+    claimed = None
+    if idempotency_key is not None:
+        claimed = claim_idempotency_key(db, "POST /orders", idempotency_key, request_hash(payload.model_dump_json()))
+        if isinstance(claimed, Response):
+            return claimed
+
     order = Order(user_id=payload.user_id)
     for item in payload.items:
         order.items.append(_materialize_item(item))
+    refresh_order_totals(order)
 
     try:
         db.add(order)
+        db.flush()
+        record_order_placed(db, order)
+        enqueue_order_event(db, "order.created", order)
+        created = OrderRead.model_validate(reload_one_order(order.id, db))
+        if claimed is not None:
+            if not renew_idempotency_key(db, claimed):
+                # A retry took the claim over after the lock lapsed; it places the order instead.
+                db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress, please retry.",
+                )
+            # Stored in the same commit as the order, so a retry either replays it or finds no order.
+            response = complete_idempotency_key(db, claimed, status.HTTP_201_CREATED, created.model_dump_json())
         db.commit()
     except SQLAlchemyError as exc:
         db.rollback()
+        if claimed is not None:
+            release_idempotency_key(db, claimed)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create order.",
         ) from exc
 
-    return reload_one_order(order.id, db)
+    return created if claimed is None else response
+
+
+@router.post(
+    "/checkout",
+    summary="Place an order from the user's cart",
+    status_code=status.HTTP_201_CREATED,
+    response_model=OrderRead,
+)
+def checkout(
+    payload: CheckoutRequest, db: DB_Session, carts: Carts, products: Products, idempotency_key: IdempotencyKeyHeader = None
+) -> OrderRead:
+    claimed = None
+    if idempotency_key is not None:
+        claimed = claim_idempotency_key(db, "POST /orders/checkout", idempotency_key, request_hash(payload.model_dump_json()))
+        if isinstance(claimed, Response):
+            return claimed
+
+    try:
+        return checkout_cart(db, payload.user_id, carts, products, claimed)
+    except HTTPException:
+        if claimed is not None:
+            release_idempotency_key(db, claimed)
+        raise
+
+
+@router.post("/status", summary="Move many orders to a status", response_model=OrderTransitionResult)
+def transition_order_status(payload: OrderStatusTransition, db: DB_Session) -> OrderTransitionResult:
+    try:
+        result = transition_orders(db, payload.order_ids, payload.status)
+        db.commit()
+    except SQLAlchemyError as exc:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to update order statuses.",
+        ) from exc
+
+    return result
 
 
 @router.post("/{order_id}/items", summary="Add or replace an item", response_model=OrderRead)
 def add_order_item(order_id: int, payload: OrderItemCreate, db: DB_Session) -> OrderRead:
     order = get_one_order_or_404(order_id, db)
 
+    before = order.total_amount
     existing_item = next((item for item in order.items if item.product_id == payload.product_id), None)
     if existing_item is not None:
         existing_item.quantity = payload.quantity
         existing_item.unit_price = payload.unit_price
     else:
         order.items.append(_materialize_item(payload))
+    refresh_order_totals(order)
 
     try:
+        apply_summary_delta(db, order.user_id, spend=counted_spend(order.status, order.total_amount - before))
+        enqueue_order_event(db, "order.updated", order)
         db.commit()
     except SQLAlchemyError as exc:
         db.rollback()
@@ -146,8 +334,13 @@ def remove_order_item(order_id: int, product_id: int, db: DB_Session) -> OrderRe
     if item is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found for order.")
 
+    before = order.total_amount
+    order.items.remove(item)
+    refresh_order_totals(order)
+
     try:
-        db.delete(item)
+        apply_summary_delta(db, order.user_id, spend=counted_spend(order.status, order.total_amount - before))
+        enqueue_order_event(db, "order.updated", order)
         db.commit()
     except SQLAlchemyError as exc:
         db.rollback()
@@ -165,8 +358,14 @@ def update_order(order_id: int, payload: OrderUpdate, db: DB_Session) -> OrderRe
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nothing to update.")
 
     order = get_one_order_or_404(order_id, db)
-
-    if payload.status is not None:
+    previous_status, before = order.status, order.total_amount
+
+    if payload.status is not None and payload.status != order.status:
+        if not can_transition(order.status, payload.status):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "Invalid status transition.", "from": order.status, "to": payload.status},
+            )
         order.status = payload.status
 
     if payload.items:
@@ -189,8 +388,15 @@ def update_order(order_id: int, payload: OrderUpdate, db: DB_Session) -> OrderRe
                 target.quantity = item_update.quantity
             if item_update.unit_price is not None:
                 target.unit_price = item_update.unit_price
+        refresh_order_totals(order)
 
     try:
+        spend = counted_spend(order.status, order.total_amount) - counted_spend(previous_status, before)
+        apply_summary_delta(db, order.user_id, spend=spend)
+        if order.status != previous_status:
+            enqueue_order_event(db, "order.status_changed", order)
+        if payload.items:
+            enqueue_order_event(db, "order.updated", order)
         db.commit()
     except SQLAlchemyError as exc:
         db.rollback()
@@ -208,6 +414,9 @@ def delete_order(order_id: int, db: DB_Session) -> None:
 
     try:
         db.delete(order)
+        db.flush()
+        record_order_removed(db, order)
+        enqueue_order_event(db, "order.deleted", order)
         db.commit()
     except SQLAlchemyError as exc:
         db.rollback()
@@ -0,0 +1,22 @@
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def check_upsert_support(bind: Engine | Connection) -> None:
+    """Fail at startup, rather than on the first write, when the backend has no ON CONFLICT support."""
+    dialect = bind.dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        raise RuntimeError(
+            f"DATABASE_URL uses the {dialect!r} dialect; this service needs PostgreSQL or SQLite for its upserts."
+        )
+
+
+def upsert_insert(db: Session, table: Table):
+    """Return a dialect-specific INSERT that supports ON CONFLICT for the session's backend."""
+    bind = db.get_bind()
+    check_upsert_support(bind)
+    return _UPSERT_INSERTS[bind.dialect.name](table)
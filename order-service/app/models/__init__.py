@@ -1,4 +1,7 @@
 from app.models.base import Base
+from app.models.idempotency import IdempotencyKey
 from app.models.order import Order, OrderItem
+from app.models.outbox import OutboxEvent
+from app.models.summary import UserOrderSummary
 
-__all__ = ("Base", "Order", "OrderItem")
\ No newline at end of file
+__all__ = ("Base", "IdempotencyKey", "Order", "OrderItem", "OutboxEvent", "UserOrderSummary")
@@ -0,0 +1,28 @@
+from app.models.base import Base, Timestamp
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Index, Integer, String, Text, func
+
+from datetime import datetime
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    scope: Mapped[str] = mapped_column(String(100), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="IN_PROGRESS")
+    response_status: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response_body: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # An IN_PROGRESS key whose lock has lapsed belongs to a request that died; a retry may take it over.
+    locked_until: Mapped[datetime] = mapped_column(Timestamp, nullable=False)
+    # Token of the request holding the claim, so a holder whose lock lapsed can tell it was taken over.
+    locked_by: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(Timestamp, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    def __repr__(self):
+        return f"IdempotencyKey(scope={self.scope!r}, key={self.key!r}, status={self.status!r})"
@@ -1,9 +1,10 @@
-from app.models.base import Base
+from app.models.base import Base, Timestamp
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, DateTime, func, ForeignKey, Numeric
+from sqlalchemy import Index, Integer, String, func, ForeignKey, Numeric
 
 from datetime import datetime
+from decimal import Decimal
 
 class Order(Base):
     __tablename__='orders'
@@ -11,14 +12,17 @@ class Order(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="PENDING")
+    # Kept equal to the sums over `items` by every item write, so listings never load items.
+    total_amount: Mapped[Decimal] = mapped_column(Numeric(12,2), nullable=False, default=0, server_default="0")
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False
@@ -30,6 +34,13 @@ class Order(Base):
         lazy="joined"
     )
     
+    # Listings page newest first on (created_at, id), globally, per user and per status.
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_orders_status_created_at", "status", "created_at", "id"),
+    )
+    
     def __repr__(self):
         return f"Order(id={self.id}, user_id={self.user_id}), status={self.status!r}"
     
@@ -44,12 +55,12 @@ class OrderItem(Base):
     unit_price: Mapped[float] = mapped_column(Numeric(10,2), nullable=False)
     
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False
@@ -0,0 +1,24 @@
+from app.models.base import Base, Timestamp
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, String, Text, func
+
+from datetime import datetime
+
+
+class OutboxEvent(Base):
+    # Written in the same commit as the order change it describes; deleted once a sink has accepted it.
+    __tablename__ = "order_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    event_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now(), nullable=False)
+
+    # Event ids double as consumers' dedup keys, so SQLite must not reuse the ids of published rows.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    def __repr__(self):
+        return f"OutboxEvent(id={self.id}, event_type={self.event_type!r}, order_id={self.order_id})"
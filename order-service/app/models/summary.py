@@ -0,0 +1,21 @@
+from app.models.base import Base, Timestamp
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, Numeric
+
+from datetime import datetime
+from decimal import Decimal
+
+
+class UserOrderSummary(Base):
+    # Maintained by every order write in the same transaction; `manage.py rebuild-order-summaries` recomputes it.
+    __tablename__ = "user_order_summaries"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    order_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Excludes cancelled orders.
+    lifetime_spend: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    last_order_at: Mapped[datetime | None] = mapped_column(Timestamp, nullable=True)
+
+    def __repr__(self):
+        return f"UserOrderSummary(user_id={self.user_id}, order_count={self.order_count}, lifetime_spend={self.lifetime_spend})"
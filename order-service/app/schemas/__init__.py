@@ -1,17 +1,35 @@
 from app.schemas.order import (
+	CheckoutRequest,
 	OrderCreate,
 	OrderItemCreate,
 	OrderItemRead,
 	OrderItemUpdate,
+	OrderListRead,
+	OrderPage,
 	OrderRead,
+	OrderStatus,
+	OrderStatusTransition,
+	OrderTransitionOutcome,
+	OrderTransitionResult,
 	OrderUpdate,
+	UserOrderSummaryRead,
 )
+from app.schemas.outbox import OutboxStats
 
 __all__ = (
+	"CheckoutRequest",
 	"OrderCreate",
 	"OrderItemCreate",
 	"OrderItemRead",
 	"OrderItemUpdate",
+	"OrderListRead",
+	"OrderPage",
 	"OrderRead",
+	"OrderStatus",
+	"OrderStatusTransition",
+	"OrderTransitionOutcome",
+	"OrderTransitionResult",
 	"OrderUpdate",
+	"OutboxStats",
+	"UserOrderSummaryRead",
 )
@@ -1,10 +1,13 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
 
+OrderStatus = Literal["PENDING", "PAID", "SHIPPED", "DELIVERED", "CANCELLED"]
+
+
 class OrderItemBase(BaseModel):
     product_id: int = Field(gt=0)
     quantity: int = Field(gt=0)
@@ -38,16 +41,56 @@ class OrderCreate(OrderBase):
     items: List[OrderItemCreate] = Field(min_length=1)
 
 
+class CheckoutRequest(OrderBase):
+    pass
+
+
 class OrderUpdate(BaseModel):
-    status: Optional[str] = Field(default=None, min_length=1, max_length=20)
+    status: Optional[OrderStatus] = None
     items: Optional[List[OrderItemUpdate]] = None
 
 
-class OrderRead(OrderBase):
+class OrderListRead(OrderBase):
     id: int
     status: str
-    items: List[OrderItemRead]
+    total_amount: Decimal
+    item_count: int = Field(description="Total quantity over all items.")
     created_at: datetime
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class OrderRead(OrderListRead):
+    items: List[OrderItemRead]
+
+
+class OrderPage(BaseModel):
+    items: List[OrderListRead]
+    next_after: Optional[str] = Field(default=None, description="Cursor for the next page, or null on the last page.")
+
+
+class OrderStatusTransition(BaseModel):
+    order_ids: List[int] = Field(min_length=1, max_length=1000)
+    status: OrderStatus
+
+
+class OrderTransitionOutcome(BaseModel):
+    order_id: int
+    outcome: Literal["updated", "unchanged", "invalid_transition", "not_found"]
+    status: Optional[str] = Field(default=None, description="The order's status after the request; null when not found.")
+
+
+class OrderTransitionResult(BaseModel):
+    status: OrderStatus
+    updated: int
+    results: List[OrderTransitionOutcome]
+
+
+class UserOrderSummaryRead(BaseModel):
+    user_id: int
+    order_count: int = 0
+    lifetime_spend: Decimal = Field(default=Decimal("0"), description="Total of all orders except cancelled ones.")
+    last_order_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class OutboxStats(BaseModel):
+    sink: str
+    pending: int = Field(description="Events not yet accepted by the sink.")
+    oldest_pending_age_seconds: Optional[float] = Field(default=None, description="How far delivery is behind; null when caught up.")
+    published: int = Field(description="Events published by this replica since it started.")
+    batches: int
+    failed_batches: int
+    consecutive_failures: int = Field(description="Failed attempts at the current batch; delivery backs off while this is above 0.")
+    last_lag_seconds: Optional[float] = Field(default=None, description="Age of the oldest event in the last published batch.")
+    last_published_at: Optional[datetime] = None
+    last_error: Optional[str] = None
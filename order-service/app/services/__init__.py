@@ -0,0 +1,99 @@
+"""Service-layer helpers shared by the API routes."""
+
+from app.services.checkout import checkout_cart
+from app.services.clients import (
+    CartClient,
+    ProductClient,
+    UpstreamError,
+    cart_client,
+    get_cart_client,
+    get_product_client,
+    product_client,
+)
+from app.services.export import EXPORT_CHUNK_SIZE, ExportFormat, export_statement, stream_export
+from app.services.idempotency import (
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS,
+    IdempotencyClaim,
+    claim_idempotency_key,
+    complete_idempotency_key,
+    discard_idempotency_key,
+    release_idempotency_key,
+    renew_idempotency_key,
+    request_hash,
+    run_idempotency_purge,
+)
+from app.services.listing import OrderFilters, apply_filters, apply_keyset, encode_cursor
+from app.services.outbox import (
+    ORDER_OUTBOX_INTERVAL_SECONDS,
+    FileSink,
+    InMemorySink,
+    LogSink,
+    OutboxDispatcher,
+    build_sink,
+    enqueue_order_event,
+    enqueue_order_events,
+    get_order_outbox,
+    order_outbox,
+)
+from app.services.status import TRANSITIONS, allowed_sources, can_transition, transition_orders
+from app.services.summaries import (
+    apply_summary_delta,
+    counted_spend,
+    read_order_summary,
+    rebuild_order_summaries,
+    record_order_placed,
+    record_order_removed,
+    record_orders_cancelled,
+)
+from app.services.totals import recompute_order_totals, refresh_order_totals
+
+__all__ = (
+    "EXPORT_CHUNK_SIZE",
+    "IDEMPOTENCY_PURGE_INTERVAL_SECONDS",
+    "ORDER_OUTBOX_INTERVAL_SECONDS",
+    "TRANSITIONS",
+    "CartClient",
+    "ExportFormat",
+    "FileSink",
+    "IdempotencyClaim",
+    "InMemorySink",
+    "LogSink",
+    "OrderFilters",
+    "OutboxDispatcher",
+    "ProductClient",
+    "UpstreamError",
+    "allowed_sources",
+    "apply_filters",
+    "apply_keyset",
+    "apply_summary_delta",
+    "build_sink",
+    "can_transition",
+    "cart_client",
+    "checkout_cart",
+    "claim_idempotency_key",
+    "complete_idempotency_key",
+    "counted_spend",
+    "discard_idempotency_key",
+    "encode_cursor",
+    "enqueue_order_event",
+    "enqueue_order_events",
+    "export_statement",
+    "get_cart_client",
+    "get_order_outbox",
+    "get_product_client",
+    "order_outbox",
+    "product_client",
+    "read_order_summary",
+    "rebuild_order_summaries",
+    "recompute_order_totals",
+    "record_order_placed",
+    "record_order_removed",
+    "record_orders_cancelled",
+    "refresh_order_totals",
+    "release_idempotency_key",
+    "renew_idempotency_key",
+    "request_hash",
+    "run_idempotency_purge",
+    "stream_export",
+    "transition_orders",
+)
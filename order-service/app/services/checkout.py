@@ -0,0 +1,177 @@
+"""Checkout: turn a user's cart into an order in one call.
+
+The steps run as a saga. Lines are priced from product-service, never from the
+cart, and stock is reserved for all of them in one call under a fresh reservation
+id. Then the order is committed, then the cart is cleared conditionally on the
+version that was read. If a later step fails, the earlier ones are undone: the
+reservation is released and the order deleted. A cart that changed during checkout
+therefore yields a 409 and no order. A cart-service outage at the very end leaves
+the order in place, because the order is what the customer asked for.
+
+With an Idempotency-Key, the claim's lock is renewed before stock is reserved and
+again, by token, in the transaction that commits the order together with its stored
+response. A retry that took the claim over after the lock lapsed therefore makes this
+checkout back out instead of placing a second order.
+
+A reserve that times out or fails with a 5xx may still have landed, so it is
+released under the same id: product-service gives the stock back if it was taken
+and refuses the reserve if it arrives afterwards.
+"""
+
+import logging
+import uuid
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, selectinload
+
+from app.models import Order, OrderItem
+from app.schemas import OrderRead
+from app.services.clients import CartClient, ProductClient, UpstreamError
+from app.services.idempotency import (
+    IdempotencyClaim,
+    complete_idempotency_key,
+    discard_idempotency_key,
+    renew_idempotency_key,
+)
+from app.services.outbox import enqueue_order_event
+from app.services.summaries import record_order_placed, record_order_removed
+from app.services.totals import refresh_order_totals
+
+logger = logging.getLogger(__name__)
+
+
+def _upstream_failure(exc: UpstreamError) -> HTTPException:
+    if exc.status_code in (status.HTTP_404_NOT_FOUND, status.HTTP_409_CONFLICT):
+        return HTTPException(status_code=exc.status_code, detail=exc.detail)
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"{exc.service} unavailable.")
+
+
+def _release(products: ProductClient, lines: list[dict], reservation_id: str) -> None:
+    try:
+        products.release_stock(lines, reservation_id)
+    except UpstreamError:
+        # The ledger keeps the reservation; releasing it again under this id is safe.
+        logger.exception("Failed to release stock reservation %s %s after an aborted checkout.", reservation_id, lines)
+
+
+def _claim_lost() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A request with this Idempotency-Key is still in progress, please retry.",
+    )
+
+
+def _hold_claim(db: Session, claimed: IdempotencyClaim) -> None:
+    try:
+        renewed = renew_idempotency_key(db, claimed)
+        db.commit()
+    except SQLAlchemyError as exc:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to check Idempotency-Key.",
+        ) from exc
+    if not renewed:
+        raise _claim_lost()
+
+
+def _current_prices(products: ProductClient, items: list[dict]) -> dict[int, int]:
+    try:
+        prices, missing = products.get_prices(sorted({item["product_id"] for item in items}))
+    except UpstreamError as exc:
+        raise _upstream_failure(exc) from exc
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Products not found.", "product_ids": missing},
+        )
+    return prices
+
+
+def checkout_cart(
+    db: Session, user_id: int, carts: CartClient, products: ProductClient, claimed: IdempotencyClaim | None = None
+) -> OrderRead | Response:
+    """Reserve stock for the user's cart, create the order and clear the cart, undoing earlier steps on failure.
+
+    Returns the order, or with `claimed` the response stored on the Idempotency-Key.
+    """
+    try:
+        etag, items = carts.get_cart(user_id)
+    except UpstreamError as exc:
+        raise _upstream_failure(exc) from exc
+    if not items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cart is empty.")
+
+    prices = _current_prices(products, items)
+    lines = [{"product_id": item["product_id"], "quantity": item["quantity"]} for item in items]
+    if claimed is not None:
+        _hold_claim(db, claimed)
+    reservation_id = uuid.uuid4().hex
+    try:
+        products.reserve_stock(lines, reservation_id)
+    except UpstreamError as exc:
+        if exc.status_code is None or exc.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+            _release(products, lines, reservation_id)
+        raise _upstream_failure(exc) from exc
+
+    order = Order(user_id=user_id)
+    for item in items:
+        order.items.append(OrderItem(product_id=item["product_id"], quantity=item["quantity"], unit_price=prices[item["product_id"]]))
+    refresh_order_totals(order)
+    try:
+        db.add(order)
+        db.flush()
+        record_order_placed(db, order)
+        enqueue_order_event(db, "order.created", order)
+        created = OrderRead.model_validate(
+            db.execute(
+                select(Order).options(selectinload(Order.items)).where(Order.id == order.id)
+            ).scalar_one()
+        )
+        if claimed is not None:
+            if not renew_idempotency_key(db, claimed):
+                db.rollback()
+                _release(products, lines, reservation_id)
+                raise _claim_lost()
+            # Stored in the same commit as the order, so a retry either replays it or finds no order.
+            response = complete_idempotency_key(db, claimed, status.HTTP_201_CREATED, created.model_dump_json())
+        db.commit()
+    except SQLAlchemyError as exc:
+        db.rollback()
+        _release(products, lines, reservation_id)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create order.") from exc
+
+    try:
+        carts.clear_cart(user_id, etag)
+    except UpstreamError as exc:
+        if exc.status_code != status.HTTP_409_CONFLICT:
+            logger.warning("Order %s placed but cart of user %s was not cleared: %s", order.id, user_id, exc)
+            return created if claimed is None else response
+        # The cart changed after it was read, so the order may not match what the customer now wants.
+        order_id = order.id
+        try:
+            db.delete(order)
+            db.flush()
+            record_order_removed(db, order)
+            enqueue_order_event(db, "order.deleted", order)
+            if claimed is not None:
+                # The stored 201 describes the order being removed; a retry must check out again.
+                discard_idempotency_key(db, claimed)
+            db.commit()
+        except SQLAlchemyError as db_exc:
+            db.rollback()
+            logger.exception("Order %s could not be removed after the cart of user %s changed.", order_id, user_id)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to undo checkout.",
+            ) from db_exc
+        finally:
+            _release(products, lines, reservation_id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cart changed during checkout, please retry.",
+        ) from exc
+
+    return created if claimed is None else response
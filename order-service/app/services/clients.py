@@ -0,0 +1,101 @@
+"""HTTP clients for the cart and product services.
+
+Each client keeps one pooled keep-alive `httpx.Client` for the life of the process.
+Pass a `transport` (for example `httpx.MockTransport`) to run against a stand-in.
+"""
+
+from typing import Any
+import os
+
+import httpx
+
+CART_SERVICE_URL = os.getenv("CART_SERVICE_URL", "http://localhost:8002")
+PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://localhost:8001")
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "5"))
+
+
+class UpstreamError(Exception):
+    """A call to another service failed; `status_code` is None when it could not be reached."""
+
+    def __init__(self, service: str, status_code: int | None, detail: Any) -> None:
+        super().__init__(f"{service} call failed ({status_code}): {detail}")
+        self.service = service
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ServiceClient:
+    service = "upstream"
+
+    def __init__(self, base_url: str, transport: httpx.BaseTransport | None = None, timeout: float = UPSTREAM_TIMEOUT_SECONDS) -> None:
+        self.base_url = base_url
+        self.transport = transport
+        self.timeout = timeout
+        self._client: httpx.Client | None = None
+
+    @property
+    def client(self) -> httpx.Client:
+        # Created on first use, and again after `close`, so the app can be restarted in-process.
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.Client(base_url=self.base_url, transport=self.transport, timeout=self.timeout)
+        return self._client
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        try:
+            response = self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            raise UpstreamError(self.service, None, str(exc)) from exc
+        if response.is_error:
+            try:
+                detail = response.json().get("detail")
+            except ValueError:
+                detail = response.text
+            raise UpstreamError(self.service, response.status_code, detail)
+        return response
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+class CartClient(ServiceClient):
+    service = "cart-service"
+
+    def get_cart(self, user_id: int) -> tuple[str, list[dict]]:
+        """Return the cart's ETag and its items."""
+        response = self.request("GET", f"/carts/{user_id}")
+        return response.headers.get("ETag", "*"), response.json()["items"]
+
+    def clear_cart(self, user_id: int, etag: str) -> None:
+        """Empty the cart, but only if it is still the version that was read."""
+        self.request("DELETE", f"/carts/{user_id}/items", headers={"If-Match": etag, "Prefer": "return=minimal"})
+
+
+class ProductClient(ServiceClient):
+    service = "product-service"
+
+    def get_prices(self, product_ids: list[int]) -> tuple[dict[int, int], list[int]]:
+        """Return the current price of each product and the ids product-service does not have."""
+        body = self.request("POST", "/products/batch", json={"ids": product_ids}).json()
+        return {product["id"]: product["price"] for product in body["items"]}, body["missing"]
+
+    def reserve_stock(self, lines: list[dict], reservation_id: str) -> None:
+        """Reserve every (product_id, quantity) line or none of them; retrying with the same id reserves once."""
+        self.request("POST", "/products/stock/reserve", json={"items": lines, "reservation_id": reservation_id})
+
+    def release_stock(self, lines: list[dict], reservation_id: str) -> None:
+        """Give back the reservation, or refuse it if it has not landed yet."""
+        self.request("POST", "/products/stock/release", json={"items": lines, "reservation_id": reservation_id})
+
+
+cart_client = CartClient(CART_SERVICE_URL)
+product_client = ProductClient(PRODUCT_SERVICE_URL)
+
+
+def get_cart_client() -> CartClient:
+    return cart_client
+
+
+def get_product_client() -> ProductClient:
+    return product_client
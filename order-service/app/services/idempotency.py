@@ -0,0 +1,213 @@
+"""Idempotency-Key support for order-creating endpoints.
+
+The first request with a key claims it by inserting an IN_PROGRESS row, committed
+before any work starts. The handler then stores its response on the row, in the
+same commit as the order when it can. Retries with the same key and body replay
+the stored response without touching the orders tables. A duplicate that arrives
+while the first request is still running polls the row until the response is
+stored. It gets a 409 if that takes longer than `IDEMPOTENCY_WAIT_SECONDS`.
+
+Only successful responses are stored. When the handler fails, the claim is
+released so the client can retry with the same key. Each claim carries a token,
+so a handler that outlives its lock can renew it, or find out that a retry took
+it over, before it commits. Keys expire after
+`IDEMPOTENCY_KEY_TTL_SECONDS` and are purged in the background.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_POLL_SECONDS = float(os.getenv("IDEMPOTENCY_POLL_SECONDS", "0.05"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+keys = IdempotencyKey.__table__
+
+
+@dataclass(frozen=True)
+class IdempotencyClaim:
+    scope: str
+    key: str
+    token: str
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def request_hash(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _match(scope: str, key: str):
+    return (keys.c.scope == scope) & (keys.c.key == key)
+
+
+def _held(claimed: IdempotencyClaim):
+    return _match(claimed.scope, claimed.key) & (keys.c.locked_by == claimed.token)
+
+
+def _replay(row) -> Response:
+    return Response(
+        content=row.response_body,
+        status_code=row.response_status,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def _try_claim(db: Session, scope: str, key: str, fingerprint: str, token: str) -> bool:
+    now = _now()
+    try:
+        db.execute(delete(keys).where(_match(scope, key) & (keys.c.expires_at < now)))
+        db.execute(
+            insert(keys).values(
+                scope=scope,
+                key=key,
+                request_hash=fingerprint,
+                status="IN_PROGRESS",
+                locked_until=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                locked_by=token,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS),
+            )
+        )
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def _take_over(db: Session, scope: str, key: str, token: str) -> bool:
+    """Take over a claim whose holder let its lock lapse; False when another request got there first."""
+    now = _now()
+    taken = db.execute(
+        update(keys)
+        .where(_match(scope, key) & (keys.c.status == "IN_PROGRESS") & (keys.c.locked_until < now))
+        .values(locked_until=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS), locked_by=token)
+    )
+    db.commit()
+    return taken.rowcount == 1
+
+
+def claim_idempotency_key(db: Session, scope: str, key: str, fingerprint: str) -> IdempotencyClaim | Response:
+    """Claim `key` for this request, or return the stored response of the request that already used it."""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    token = uuid.uuid4().hex
+    try:
+        if _try_claim(db, scope, key, fingerprint, token):
+            return IdempotencyClaim(scope, key, token)
+        while True:
+            row = db.execute(select(keys).where(_match(scope, key))).one_or_none()
+            # Ends the read transaction so the next poll sees the holder's commit.
+            db.rollback()
+            if row is None:
+                # The holder failed and released the key.
+                if _try_claim(db, scope, key, fingerprint, token):
+                    return IdempotencyClaim(scope, key, token)
+                continue
+            if row.request_hash != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                    detail="Idempotency-Key was already used with a different request.",
+                )
+            if row.status == "COMPLETED":
+                return _replay(row)
+            if _take_over(db, scope, key, token):
+                return IdempotencyClaim(scope, key, token)
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress, please retry.",
+                )
+            time.sleep(IDEMPOTENCY_POLL_SECONDS)
+    except SQLAlchemyError as exc:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to check Idempotency-Key.",
+        ) from exc
+
+
+def renew_idempotency_key(db: Session, claimed: IdempotencyClaim) -> bool:
+    """Extend the claim's lock; False when a retry took it over after the lock lapsed.
+
+    Saved by the caller's next commit. Until then the row stays locked, so a retry cannot
+    take the claim over between this check and the commit.
+    """
+    renewed = db.execute(
+        update(keys)
+        .where(_held(claimed) & (keys.c.status == "IN_PROGRESS"))
+        .values(locked_until=_now() + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS))
+    )
+    return renewed.rowcount == 1
+
+
+def complete_idempotency_key(db: Session, claimed: IdempotencyClaim, status_code: int, body: str) -> Response:
+    """Store the response on the claimed key; it is saved by the caller's next commit."""
+    db.execute(
+        update(keys)
+        .where(_held(claimed))
+        .values(status="COMPLETED", response_status=status_code, response_body=body)
+    )
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+def discard_idempotency_key(db: Session, claimed: IdempotencyClaim) -> None:
+    """Drop the claim, completed or not, as part of the caller's transaction that undoes its work."""
+    db.execute(delete(keys).where(_held(claimed)))
+
+
+def release_idempotency_key(db: Session, claimed: IdempotencyClaim) -> None:
+    """Drop the claim after a failed request so a retry with the same key runs again."""
+    try:
+        db.rollback()
+        db.execute(delete(keys).where(_held(claimed) & (keys.c.status == "IN_PROGRESS")))
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        logger.exception("Failed to release Idempotency-Key %r; it frees up after its lock lapses.", claimed.key)
+
+
+def purge_expired_keys(db: Session) -> int:
+    """Delete keys past their TTL; returns how many were removed."""
+    purged = db.execute(delete(keys).where(keys.c.expires_at < _now()))
+    db.commit()
+    return purged.rowcount
+
+
+def _purge() -> int:
+    with SessionLocal() as db:
+        return purge_expired_keys(db)
+
+
+async def run_idempotency_purge(interval: float = IDEMPOTENCY_PURGE_INTERVAL_SECONDS) -> None:
+    """Purge expired Idempotency-Keys every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await asyncio.to_thread(_purge)
+        except SQLAlchemyError:
+            logger.exception("Idempotency-Key purge failed; retrying on the next run.")
+            continue
+        logger.info("Purged %d expired Idempotency-Keys.", purged)
@@ -0,0 +1,79 @@
+"""Filters and keyset cursors for order listings, newest first."""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import Select, and_, literal, or_
+from sqlalchemy.types import TypeDecorator
+
+from app.models import Order
+from app.models.base import Timestamp
+
+
+@dataclass(frozen=True)
+class OrderFilters:
+    user_id: int | None = None
+    status: str | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+
+
+class _UtcBound(TypeDecorator):
+    """A timestamp bound, with naive values taken as UTC.
+
+    SQLite stores naive UTC text, so aware bounds are converted rather than having their
+    offset dropped. Elsewhere they stay aware: a naive value compared with `timestamptz`
+    would be read in the session's TimeZone.
+    """
+
+    impl = Timestamp
+    cache_ok = True
+
+    def process_bind_param(self, value: datetime | None, dialect) -> datetime | None:
+        if value is None:
+            return None
+        aware = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        if dialect.name == "sqlite":
+            return aware.astimezone(timezone.utc).replace(tzinfo=None)
+        return aware
+
+
+def _as_utc(value: datetime):
+    return literal(value, _UtcBound())
+
+
+def apply_filters(stmt: Select, filters: OrderFilters) -> Select:
+    """Restrict to the user and status, and to `created_from <= created_at < created_to`."""
+    if filters.user_id is not None:
+        stmt = stmt.where(Order.user_id == filters.user_id)
+    if filters.status is not None:
+        stmt = stmt.where(Order.status == filters.status)
+    if filters.created_from is not None:
+        stmt = stmt.where(Order.created_at >= _as_utc(filters.created_from))
+    if filters.created_to is not None:
+        stmt = stmt.where(Order.created_at < _as_utc(filters.created_to))
+    return stmt
+
+
+def encode_cursor(order: Any) -> str:
+    """Build the opaque cursor for the order a page ended on, from an ORM instance or a Core row."""
+    return f"{order.created_at.isoformat()},{order.id}"
+
+
+def apply_keyset(stmt: Select, after: str | None) -> Select:
+    """Order newest first and skip everything up to and including the cursor.
+
+    Raises ValueError for malformed cursors.
+    """
+    stmt = stmt.order_by(Order.created_at.desc(), Order.id.desc())
+    if after is None:
+        return stmt
+
+    raw_created_at, _, raw_id = after.rpartition(",")
+    created_at = _as_utc(datetime.fromisoformat(raw_created_at))
+    last_id = int(raw_id)
+    # Expanded row-value comparison; each branch can use the (..., created_at, id) composite indexes.
+    return stmt.where(
+        or_(Order.created_at < created_at, and_(Order.created_at == created_at, Order.id < last_id))
+    )
@@ -0,0 +1,256 @@
+"""Transactional outbox for order events.
+
+Routes call `enqueue_order_event` before they commit, so an event exists exactly
+when its order change does. `OutboxDispatcher` drains the `order_outbox` table in
+batches of `ORDER_OUTBOX_BATCH_SIZE` in id order. It hands each batch to a sink and
+deletes the rows once the sink accepts them.
+
+Delivery is at least once. A crash between publishing and deleting republishes the
+batch, so consumers deduplicate on the event `id`. After a failed batch the
+dispatcher pauses with exponential backoff, from `ORDER_OUTBOX_BACKOFF_SECONDS` up
+to `ORDER_OUTBOX_MAX_BACKOFF_SECONDS`, and then retries the same batch, so one dispatcher
+never publishes events out of order.
+
+`ORDER_EVENTS_SINK` picks the sink:
+
+- "log" (the default) writes each event to the service log.
+- "memory" keeps events in the process, for tests.
+- "file:<path>" appends NDJSON lines to a file that local consumers can tail.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Protocol
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models import Order, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+ORDER_EVENTS_SINK = os.getenv("ORDER_EVENTS_SINK", "log")
+ORDER_OUTBOX_INTERVAL_SECONDS = float(os.getenv("ORDER_OUTBOX_INTERVAL_SECONDS", "1"))
+ORDER_OUTBOX_BATCH_SIZE = int(os.getenv("ORDER_OUTBOX_BATCH_SIZE", "500"))
+ORDER_OUTBOX_BACKOFF_SECONDS = float(os.getenv("ORDER_OUTBOX_BACKOFF_SECONDS", "1"))
+ORDER_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("ORDER_OUTBOX_MAX_BACKOFF_SECONDS", "300"))
+
+outbox = OutboxEvent.__table__
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _age_seconds(created_at: datetime, now: datetime) -> float:
+    # SQLite hands back naive UTC.
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (now - created_at).total_seconds())
+
+
+def order_event_payload(order: Any) -> dict[str, Any]:
+    """Event data for an order, from an ORM instance or a Core row."""
+    return {
+        "order_id": order.id,
+        "user_id": order.user_id,
+        "status": order.status,
+        "total_amount": str(order.total_amount),
+        "item_count": order.item_count,
+    }
+
+
+def enqueue_order_events(db: Session, event_type: str, orders: Iterable[Any]) -> None:
+    """Add one event per order to the outbox in a single INSERT. The caller commits."""
+    rows = [
+        {"event_type": event_type, "order_id": order.id, "payload": json.dumps(order_event_payload(order))}
+        for order in orders
+    ]
+    if rows:
+        db.execute(insert(outbox), rows)
+
+
+def enqueue_order_event(db: Session, event_type: str, order: Order) -> None:
+    """Add an event for a flushed order to the outbox. The caller commits."""
+    enqueue_order_events(db, event_type, [order])
+
+
+class OutboxSink(Protocol):
+    name: str
+
+    def publish(self, events: list[dict[str, Any]]) -> None:
+        """Deliver a batch in order, or raise so the whole batch is retried."""
+
+
+class LogSink:
+    name = "log"
+
+    def publish(self, events: list[dict[str, Any]]) -> None:
+        for event in events:
+            logger.info("Order event %s", json.dumps(event))
+
+
+class InMemorySink:
+    name = "memory"
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+
+    def publish(self, events: list[dict[str, Any]]) -> None:
+        self.events.extend(events)
+
+
+class FileSink:
+    name = "file"
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def publish(self, events: list[dict[str, Any]]) -> None:
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.writelines(json.dumps(event) + "\n" for event in events)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def build_sink(spec: str = ORDER_EVENTS_SINK) -> OutboxSink:
+    """Create the sink named by `ORDER_EVENTS_SINK`."""
+    if spec == "log":
+        return LogSink()
+    if spec == "memory":
+        return InMemorySink()
+    if spec.startswith("file:"):
+        return FileSink(spec.removeprefix("file:"))
+    raise ValueError(f"Unknown ORDER_EVENTS_SINK {spec!r}; expected 'log', 'memory' or 'file:<path>'.")
+
+
+class OutboxDispatcher:
+    """Publish outbox events to a sink in batches and keep delivery counters."""
+
+    def __init__(
+        self,
+        sink: OutboxSink,
+        batch_size: int = ORDER_OUTBOX_BATCH_SIZE,
+        backoff_seconds: float = ORDER_OUTBOX_BACKOFF_SECONDS,
+        max_backoff_seconds: float = ORDER_OUTBOX_MAX_BACKOFF_SECONDS,
+    ) -> None:
+        self.sink = sink
+        self.batch_size = batch_size
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.published = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_error: str | None = None
+        self.last_lag_seconds: float | None = None
+        self.last_published_at: datetime | None = None
+        self.consecutive_failures = 0
+        self._retry_at = 0.0
+        # One batch at a time per process; SKIP LOCKED spreads batches over replicas.
+        self._lock = threading.Lock()
+
+    def _backoff(self) -> float:
+        return min(self.max_backoff_seconds, self.backoff_seconds * 2 ** max(self.consecutive_failures - 1, 0))
+
+    def dispatch_batch(self, db: Session) -> int:
+        """Publish the oldest batch of events and return how many were published.
+
+        Returns 0 when the outbox is empty, the dispatcher is backing off or the sink failed.
+        """
+        with self._lock:
+            if time.monotonic() < self._retry_at:
+                return 0
+            rows = db.execute(
+                select(outbox)
+                .order_by(outbox.c.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not rows:
+                db.rollback()
+                return 0
+
+            events = [
+                {
+                    "id": row.id,
+                    "type": row.event_type,
+                    "order_id": row.order_id,
+                    "occurred_at": row.created_at.isoformat(),
+                    "data": json.loads(row.payload),
+                }
+                for row in rows
+            ]
+            ids = [row.id for row in rows]
+            try:
+                self.sink.publish(events)
+            except Exception as exc:
+                db.execute(update(outbox).where(outbox.c.id.in_(ids)).values(attempts=outbox.c.attempts + 1))
+                db.commit()
+                self.failed_batches += 1
+                self.consecutive_failures += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                backoff = self._backoff()
+                self._retry_at = time.monotonic() + backoff
+                logger.warning("Publishing %d order events failed; retrying in %.1fs: %s", len(ids), backoff, exc)
+                return 0
+
+            db.execute(delete(outbox).where(outbox.c.id.in_(ids)))
+            db.commit()
+            self.published += len(ids)
+            self.batches += 1
+            self.consecutive_failures = 0
+            self.last_published_at = _now()
+            self.last_lag_seconds = round(_age_seconds(rows[0].created_at, self.last_published_at), 3)
+            return len(ids)
+
+    def drain(self) -> int:
+        """Publish due events until a batch comes back short. Returns how many were published."""
+        published = 0
+        with SessionLocal() as db:
+            while (count := self.dispatch_batch(db)) > 0:
+                published += count
+                if count < self.batch_size:
+                    break
+        return published
+
+    async def run(self, interval: float = ORDER_OUTBOX_INTERVAL_SECONDS) -> None:
+        """Drain the outbox every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.drain)
+            except SQLAlchemyError:
+                logger.exception("Order outbox dispatch failed; retrying on the next run.")
+            await asyncio.sleep(interval)
+
+    def stats(self, db: Session) -> dict[str, Any]:
+        """Backlog size and age from the table, plus this process's delivery counters."""
+        pending, oldest = db.execute(select(func.count(), func.min(outbox.c.created_at)).select_from(outbox)).one()
+        return {
+            "sink": self.sink.name,
+            "pending": pending,
+            "oldest_pending_age_seconds": round(_age_seconds(oldest, _now()), 3) if oldest is not None else None,
+            "published": self.published,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "consecutive_failures": self.consecutive_failures,
+            "last_lag_seconds": self.last_lag_seconds,
+            "last_published_at": self.last_published_at,
+            "last_error": self.last_error,
+        }
+
+
+order_outbox = OutboxDispatcher(build_sink())
+
+
+def get_order_outbox() -> OutboxDispatcher:
+    """Dependency for routes, overridable in tests with a dispatcher on an in-memory sink."""
+    return order_outbox
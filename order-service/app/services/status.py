@@ -0,0 +1,63 @@
+"""The order status state machine and set-based bulk transitions.
+
+PENDING -> PAID -> SHIPPED -> DELIVERED, and PENDING or PAID -> CANCELLED.
+DELIVERED and CANCELLED are final.
+"""
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models import Order
+from app.schemas import OrderStatus, OrderTransitionOutcome, OrderTransitionResult
+from app.services.outbox import enqueue_order_events
+from app.services.summaries import UNCOUNTED_STATUS, record_orders_cancelled
+
+TRANSITIONS: dict[str, frozenset[str]] = {
+    "PENDING": frozenset({"PAID", "CANCELLED"}),
+    "PAID": frozenset({"SHIPPED", "CANCELLED"}),
+    "SHIPPED": frozenset({"DELIVERED"}),
+    "DELIVERED": frozenset(),
+    "CANCELLED": frozenset(),
+}
+
+
+def can_transition(current: str, target: str) -> bool:
+    return target in TRANSITIONS.get(current, frozenset())
+
+
+def allowed_sources(target: str) -> list[str]:
+    """Statuses an order may move to `target` from."""
+    return sorted(source for source, targets in TRANSITIONS.items() if target in targets)
+
+
+def transition_orders(db: Session, order_ids: list[int], target: OrderStatus) -> OrderTransitionResult:
+    """Move every listed order allowed to reach `target` there in one UPDATE, and report the outcome per order.
+
+    Only `orders` columns are read; items are never loaded. The caller commits.
+    """
+    orders = Order.__table__
+    ids = list(dict.fromkeys(order_ids))
+    # The status guard is evaluated per row inside the UPDATE, so a concurrent transition cannot be overwritten.
+    changed = db.execute(
+        update(orders)
+        .where(orders.c.id.in_(ids), orders.c.status.in_(allowed_sources(target)))
+        .values(status=target)
+        .returning(orders.c.id, orders.c.user_id, orders.c.status, orders.c.total_amount, orders.c.item_count)
+    ).all()
+    updated = {row.id for row in changed}
+    enqueue_order_events(db, "order.status_changed", changed)
+    if target == UNCOUNTED_STATUS:
+        record_orders_cancelled(db, list(updated))
+    skipped = [order_id for order_id in ids if order_id not in updated]
+    current = dict(db.execute(select(orders.c.id, orders.c.status).where(orders.c.id.in_(skipped))).all()) if skipped else {}
+
+    results = []
+    for order_id in ids:
+        if order_id in updated:
+            results.append(OrderTransitionOutcome(order_id=order_id, outcome="updated", status=target))
+        elif order_id not in current:
+            results.append(OrderTransitionOutcome(order_id=order_id, outcome="not_found"))
+        else:
+            outcome = "unchanged" if current[order_id] == target else "invalid_transition"
+            results.append(OrderTransitionOutcome(order_id=order_id, outcome=outcome, status=current[order_id]))
+    return OrderTransitionResult(status=target, updated=len(updated), results=results)
@@ -0,0 +1,97 @@
+"""Per-user order summaries maintained alongside order writes.
+
+Every write path adds its change to the user's `user_order_summaries` row in the
+same transaction. The account page then reads one row instead of loading every
+order and item. `rebuild_order_summaries` recomputes all rows from `orders` and
+`order_items` and fixes any drift.
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db import upsert_insert
+from app.models import Order, OrderItem, UserOrderSummary
+
+UNCOUNTED_STATUS = "CANCELLED"
+
+summaries = UserOrderSummary.__table__
+
+
+def counted_spend(status: str, amount: Decimal) -> Decimal:
+    """The part of `amount` that counts towards lifetime spend for an order in `status`."""
+    return Decimal("0") if status == UNCOUNTED_STATUS else amount
+
+
+def apply_summary_delta(
+    db: Session, user_id: int, orders: int = 0, spend: Decimal = Decimal("0"), placed: bool = False
+) -> None:
+    """Add to the user's order count and spend, moving the last order date to now when `placed`. The caller commits."""
+    if not orders and not spend and not placed:
+        return
+    stmt = upsert_insert(db, summaries).values(
+        user_id=user_id,
+        order_count=orders,
+        lifetime_spend=spend,
+        last_order_at=func.now() if placed else None,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={
+            "order_count": summaries.c.order_count + stmt.excluded.order_count,
+            "lifetime_spend": summaries.c.lifetime_spend + stmt.excluded.lifetime_spend,
+            "last_order_at": func.coalesce(stmt.excluded.last_order_at, summaries.c.last_order_at),
+        },
+    )
+    db.execute(stmt)
+
+
+def record_order_placed(db: Session, order: Order) -> None:
+    """Count a new, flushed order."""
+    apply_summary_delta(db, order.user_id, orders=1, spend=counted_spend(order.status, order.total_amount), placed=True)
+
+
+def record_order_removed(db: Session, order: Order) -> None:
+    """Uncount an order whose delete has been flushed; the last order date falls back to the newest remaining order."""
+    apply_summary_delta(db, order.user_id, orders=-1, spend=-counted_spend(order.status, order.total_amount))
+    newest = select(func.max(Order.created_at)).where(Order.user_id == order.user_id).scalar_subquery()
+    db.execute(update(summaries).where(summaries.c.user_id == order.user_id).values(last_order_at=newest))
+
+
+def rebuild_order_summaries(db: Session) -> int:
+    """Recompute every user's summary from the orders tables and commit. Returns the number of summary rows."""
+    items = OrderItem.__table__
+    orders = Order.__table__
+    totals = (
+        select(items.c.order_id, func.sum(items.c.quantity * items.c.unit_price).label("total"))
+        .group_by(items.c.order_id)
+        .subquery()
+    )
+    spend = func.coalesce(func.sum(case((orders.c.status != UNCOUNTED_STATUS, totals.c.total), else_=0)), 0)
+    db.execute(delete(summaries))
+    db.execute(
+        insert(summaries).from_select(
+            ["user_id", "order_count", "lifetime_spend", "last_order_at"],
+            select(orders.c.user_id, func.count(), spend, func.max(orders.c.created_at))
+            .select_from(orders.outerjoin(totals, totals.c.order_id == orders.c.id))
+            .group_by(orders.c.user_id),
+        )
+    )
+    db.commit()
+    return db.execute(select(func.count()).select_from(summaries)).scalar_one()
+
+
+def record_orders_cancelled(db: Session, order_ids: list[int]) -> None:
+    """Take just-cancelled orders out of their users' lifetime spend with one grouped query over their stored totals."""
+    if not order_ids:
+        return
+    totals = db.execute(
+        select(Order.user_id, func.sum(Order.total_amount)).where(Order.id.in_(order_ids)).group_by(Order.user_id)
+    ).all()
+    for user_id, total in totals:
+        apply_summary_delta(db, user_id, spend=-Decimal(total))
+
+
+def read_order_summary(db: Session, user_id: int) -> UserOrderSummary | None:
+    return db.get(UserOrderSummary, user_id)
@@ -0,0 +1,34 @@
+"""Stored order totals.
+
+`orders.total_amount` and `orders.item_count` are recomputed from the order's items
+whenever a route changes them. `recompute_order_totals` repairs every order in one
+UPDATE, e.g. after upgrading a database that predates the columns.
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Order, OrderItem
+
+
+def refresh_order_totals(order: Order) -> None:
+    """Set the order's stored totals from its loaded items."""
+    order.item_count = sum(item.quantity for item in order.items)
+    order.total_amount = sum((item.quantity * Decimal(item.unit_price) for item in order.items), Decimal("0"))
+
+
+def recompute_order_totals(db: Session) -> int:
+    """Recompute the stored totals of every order from `order_items` and commit. Returns the number of orders."""
+    items = OrderItem.__table__
+    orders = Order.__table__
+    of_order = items.c.order_id == orders.c.id
+    updated = db.execute(
+        update(orders).values(
+            total_amount=select(func.coalesce(func.sum(items.c.quantity * items.c.unit_price), 0)).where(of_order).scalar_subquery(),
+            item_count=select(func.coalesce(func.sum(items.c.quantity), 0)).where(of_order).scalar_subquery(),
+        )
+    )
+    db.commit()
+    return updated.rowcount
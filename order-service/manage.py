@@ -0,0 +1,46 @@
+"""Maintenance commands for the order service.
+
+Usage: python manage.py <command>
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+
+def rebuild_order_summaries() -> None:
+    from app.db import SessionLocal, engine
+    from app.models import Base
+    from app.services import rebuild_order_summaries as rebuild
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        print(f"Rebuilt {rebuild(db)} order summaries.")
+
+
+def recompute_order_totals() -> None:
+    from app.db import SessionLocal, engine
+    from app.models import Base
+    from app.services import recompute_order_totals as recompute
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        print(f"Recomputed totals of {recompute(db)} orders.")
+
+
+COMMANDS = {
+    "rebuild-order-summaries": rebuild_order_summaries,
+    "recompute-order-totals": recompute_order_totals,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Order service maintenance commands.")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    load_dotenv()
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,28 @@
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from dotenv import load_dotenv
+import asyncio
 
 from app.models import Base
-from app.db import engine
+from app.db import check_upsert_support, engine
 from app.api import api_router
+from app.services import INVENTORY_COMPACTION_INTERVAL_SECONDS, ensure_search_index, run_inventory_compaction
 
 @asynccontextmanager
 async def lifespan(_:FastAPI):
-    """Ensure database tables exist before the application starts serving."""
+    """Ensure database tables and the search index exist, and run inventory compaction while serving."""
+    check_upsert_support(engine)
     Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+
+    compaction = None
+    if INVENTORY_COMPACTION_INTERVAL_SECONDS > 0:
+        compaction = asyncio.create_task(run_inventory_compaction(INVENTORY_COMPACTION_INTERVAL_SECONDS))
     yield
+    if compaction is not None:
+        compaction.cancel()
+        with suppress(asyncio.CancelledError):
+            await compaction
     
 
 def create_app() -> FastAPI:
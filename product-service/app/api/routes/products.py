@@ -1,12 +1,53 @@
-from app.db import get_db
-from app.models import Product
-from app.schemas import ProductBase, ProductRead, ProductUpdate
+from app.db import SessionLocal, get_db
+from app.models import Product, ProductTombstone
+from app.schemas import (
+    ProductBase,
+    ProductBatchRead,
+    ProductBatchRequest,
+    ProductChange,
+    ProductChangeFeed,
+    ProductFacets,
+    ProductImportResult,
+    ProductPage,
+    ProductRead,
+    ProductSearchPage,
+    ProductUpdate,
+    StockLevel,
+    StockRead,
+    StockRequest,
+)
+from app.services import (
+    STOCK_CHANGE_ATTEMPTS,
+    STOCK_CHANGE_BACKOFF_SECONDS,
+    CatalogFilters,
+    CatalogSort,
+    ImportFormat,
+    apply_facet_deltas,
+    apply_filters,
+    apply_keyset,
+    available_stock,
+    discard_movements,
+    encode_change_cursor,
+    encode_cursor,
+    facet_deltas,
+    import_products,
+    product_cache,
+    product_etag,
+    read_changes,
+    read_facets,
+    release_stock,
+    reserve_stock,
+    search_products,
+)
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from sqlalchemy.exc import SQLAlchemyError
-from typing import Annotated
+from sqlalchemy import Select, select
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
+from typing import Annotated, Callable, Iterator, Literal
+import random
+import time
 
 
 # Dependency alias to inject a scoped SQLAlchemy session per request.
@@ -14,27 +55,202 @@ DB_Session = Annotated[Session, Depends(get_db)]
 
 router = APIRouter(tags=["Products"], prefix="/products")
 
-@router.get("/all", summary="Get all products", status_code=200, response_model=list[ProductRead])
-def get_all_products(db:DB_Session) -> list[ProductRead]:
-    """Return the complete product catalog ordered by identifier."""
+MAX_PAGE_SIZE = 500
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_CHANGE_FEED_SIZE = 1000
+# Keeps a single IN list well below the bound-parameter limits of SQLite and Postgres.
+BATCH_LOOKUP_CHUNK_SIZE = 1000
+# Rows fetched per round trip while streaming the catalog as NDJSON.
+STREAM_CHUNK_SIZE = 1000
+
+
+def _catalog_statement(stmt: Select, filters: CatalogFilters, sort: CatalogSort, after: str | None) -> Select:
+    try:
+        return apply_keyset(apply_filters(stmt, filters), sort, after)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.") from exc
+
+
+def _stream_products(stmt: Select) -> Iterator[bytes]:
+    """Yield the catalog as NDJSON, pulling rows from the cursor in fixed-size chunks."""
+    # The request-scoped session may be closed before the body is sent, so the stream owns its session.
+    db = SessionLocal()
+    try:
+        for rows in db.execute(stmt.execution_options(yield_per=STREAM_CHUNK_SIZE)).partitions():
+            yield b"".join(ProductRead.model_validate(row._mapping).model_dump_json().encode() + b"\n" for row in rows)
+    finally:
+        db.close()
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Evaluate an If-None-Match header, which may list several tags or be a wildcard."""
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+@router.get("/all", summary="Get all products", status_code=200, response_model=ProductPage)
+def get_all_products(
+    db: DB_Session,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = 100,
+    after: Annotated[str | None, Query(description="The next_after cursor of the previous page, for the same sort and filters.")] = None,
+    category: Annotated[str | None, Query(min_length=3, max_length=50)] = None,
+    min_price: Annotated[int | None, Query(ge=0)] = None,
+    max_price: Annotated[int | None, Query(ge=0)] = None,
+    in_stock: bool = False,
+    sort: CatalogSort = "id",
+    output: Annotated[Literal["json", "ndjson"], Query(alias="format")] = "json",
+) -> ProductPage:
+    """Return one filtered keyset page of the catalog, or stream all matching products as NDJSON."""
+    filters = CatalogFilters(category=category, min_price=min_price, max_price=max_price, in_stock=in_stock)
+    if output == "ndjson":
+        # Selecting the table instead of the entity keeps rows out of the identity map.
+        stmt = _catalog_statement(select(Product.__table__), filters, sort, after)
+        return StreamingResponse(_stream_products(stmt), media_type="application/x-ndjson")
+
+    stmt = _catalog_statement(select(Product), filters, sort, after).limit(limit + 1)
     try:
-        products = db.execute(select(Product).order_by(Product.id))
-        return list(products.scalars().all())
+        products = list(db.execute(stmt).scalars().all())
     except SQLAlchemyError as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve products.") from exc
 
-@router.get("/{id}", summary="Get Products with Id", status_code=200, response_model=ProductRead)
-def get_products_with_id(id:int, db:DB_Session) -> ProductRead:
-    """Fetch a single product or raise 404 when it does not exist."""
+    # The extra row only tells us whether another page exists.
+    has_more = len(products) > limit
+    products = products[:limit]
+    return ProductPage(items=products, next_after=encode_cursor(products[-1], sort) if has_more else None)
+
+@router.get("/search", summary="Full-text product search", status_code=200, response_model=ProductSearchPage)
+def search_catalog(
+    db: DB_Session,
+    q: Annotated[str, Query(min_length=1, max_length=200, description="Terms matched as prefixes against name, description and category.")],
+    limit: Annotated[int, Query(ge=1, le=MAX_SEARCH_PAGE_SIZE)] = 20,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> ProductSearchPage:
+    """Return products matching every term, ranked by relevance."""
     try:
-        product = db.execute(select(Product).where(Product.id == id)).scalar_one_or_none()
+        products = search_products(db, q, limit + 1, offset)
     except SQLAlchemyError as exc:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve product.") from exc
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Product search failed.") from exc
 
-    if product is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found.")
+    has_more = len(products) > limit
+    return ProductSearchPage(items=products[:limit], next_offset=offset + limit if has_more else None)
+
+@router.get("/changes", summary="Products changed or deleted since a cursor", status_code=200, response_model=ProductChangeFeed)
+def get_product_changes(
+    db: DB_Session,
+    since: Annotated[str | None, Query(description="Cursor from the previous call; omit to start from the beginning.")] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_CHANGE_FEED_SIZE)] = 100,
+) -> ProductChangeFeed:
+    """Return updates and deletion tombstones after the cursor in (changed_at, id) order."""
+    try:
+        changes = read_changes(db, since, limit + 1)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.") from exc
+    except SQLAlchemyError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve product changes.") from exc
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return ProductChangeFeed(
+        changes=[
+            ProductChange(product_id=product_id, changed_at=changed_at, deleted=product is None, product=product)
+            for changed_at, product_id, product in changes
+        ],
+        cursor=encode_change_cursor(changes[-1][0], changes[-1][1]) if changes else since,
+        has_more=has_more,
+    )
+
+@router.get("/facets", summary="Product counts per category and price bucket", status_code=200, response_model=ProductFacets)
+def get_product_facets(db: DB_Session) -> ProductFacets:
+    """Serve facet counts from the maintained aggregate instead of grouping the catalog."""
+    try:
+        categories, buckets = read_facets(db)
+    except SQLAlchemyError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve facets.") from exc
 
-    return product
+    return ProductFacets(
+        categories=[{"category": category, "count": count} for category, count in categories],
+        price_buckets=[{"min_price": low, "max_price": high, "count": count} for low, high, count in buckets],
+    )
+
+@router.get("/stock", summary="Available stock for many products", status_code=200, response_model=StockRead)
+def get_available_stock(
+    db: DB_Session,
+    ids: Annotated[list[int], Query(min_length=1, max_length=BATCH_LOOKUP_CHUNK_SIZE)],
+) -> StockRead:
+    """Combine each product's stock snapshot with its pending ledger movements."""
+    try:
+        available = available_stock(db, list(dict.fromkeys(ids)))
+    except SQLAlchemyError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve stock.") from exc
+    return _stock_read(available)
+
+@router.get("/cache/stats", summary="Product cache counters", status_code=200, response_model=dict[str, int | float])
+def get_cache_stats() -> dict[str, int | float]:
+    """Expose hit, miss and eviction counters so the cache can be sized."""
+    return product_cache.stats()
+
+@router.get(
+    "/{id}",
+    summary="Get Products with Id",
+    status_code=200,
+    response_model=ProductRead,
+    responses={304: {"description": "The client's copy, identified by If-None-Match, is current."}},
+)
+def get_products_with_id(
+    id:int,
+    db:DB_Session,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> ProductRead:
+    """Fetch a single product through the read-through cache, honouring If-None-Match."""
+    cached = product_cache.get(id)
+    if cached is None:
+        # Taken before the read, so a write that commits and invalidates meanwhile keeps this copy out of the cache.
+        generation = product_cache.generation()
+        try:
+            product = db.execute(select(Product).where(Product.id == id)).scalar_one_or_none()
+        except SQLAlchemyError as exc:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve product.") from exc
+
+        if product is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found.")
+
+        etag = product_etag(product)
+        if if_none_match is not None and _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        cached = product_cache.put(id, ProductRead.model_validate(product).model_dump_json().encode(), etag, generation)
+    elif if_none_match is not None and _etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": cached.etag})
+
+    return Response(content=cached.body, media_type="application/json", headers={"ETag": cached.etag})
+
+@router.post("/batch", summary="Get many products by id", status_code=200, response_model=ProductBatchRead)
+def get_products_batch(req: ProductBatchRequest, db: DB_Session) -> ProductBatchRead:
+    """Resolve many ids with one IN query, preserving request order and reporting missing ids."""
+    ids = list(dict.fromkeys(req.ids))
+    found: dict[int, Product] = {}
+    try:
+        for start in range(0, len(ids), BATCH_LOOKUP_CHUNK_SIZE):
+            chunk = ids[start:start + BATCH_LOOKUP_CHUNK_SIZE]
+            found.update((product.id, product) for product in db.execute(select(Product).where(Product.id.in_(chunk))).scalars())
+    except SQLAlchemyError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve products.") from exc
+
+    return ProductBatchRead(
+        items=[found[product_id] for product_id in ids if product_id in found],
+        missing=[product_id for product_id in ids if product_id not in found],
+    )
+
+@router.post("/import", summary="Bulk upsert products from a CSV or NDJSON feed", status_code=200, response_model=ProductImportResult)
+async def import_product_feed(
+    request: Request,
+    db: DB_Session,
+    input_format: Annotated[ImportFormat | None, Query(alias="format", description="Defaults to csv for text/csv bodies, otherwise ndjson.")] = None,
+) -> ProductImportResult:
+    """Stream the request body into the catalog, upserting rows by name in batches."""
+    if input_format is None:
+        input_format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    return await import_products(request.stream(), input_format, db)
 
 @router.post("/create", summary="create a product", status_code=201, response_model=ProductRead)
 def create_product(req_product:ProductBase, db:DB_Session) -> ProductRead:
@@ -57,6 +273,7 @@ def create_product(req_product:ProductBase, db:DB_Session) -> ProductRead:
 
     try:
         db.add(product)
+        apply_facet_deltas(db, facet_deltas(added=[(product.category, product.price)]))
         db.commit()
         db.refresh(product)
         return product
@@ -65,6 +282,42 @@ def create_product(req_product:ProductBase, db:DB_Session) -> ProductRead:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Product creation failed.") from exc
 
 
+def _stock_read(available: dict[int, int]) -> StockRead:
+    return StockRead(items=[StockLevel(product_id=pid, stock=stock) for pid, stock in available.items()])
+
+def _apply_stock_change(db: Session, change: Callable[[], dict[int, int]], failure: str) -> StockRead:
+    """Run and commit a ledger change, running it again when a concurrent change wins.
+
+    Serialization failures, lock timeouts and a racing duplicate reservation id are retried
+    with jittered backoff up to `STOCK_CHANGE_ATTEMPTS` times before the client gets a 409.
+    """
+    attempt = 0
+    while True:
+        try:
+            available = change()
+            db.commit()
+            return _stock_read(available)
+        except (IntegrityError, OperationalError) as exc:
+            db.rollback()
+            attempt += 1
+            if attempt >= STOCK_CHANGE_ATTEMPTS:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Concurrent stock change, please retry.") from exc
+        except SQLAlchemyError as exc:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=failure) from exc
+        time.sleep(random.uniform(0, STOCK_CHANGE_BACKOFF_SECONDS * 2**attempt))
+
+@router.post("/stock/reserve", summary="Reserve stock for many products", status_code=200, response_model=StockRead)
+def reserve_product_stock(req: StockRequest, db: DB_Session) -> StockRead:
+    """Record a reservation for every line in the ledger, failing the whole request with 409 if any line is short."""
+    return _apply_stock_change(db, lambda: reserve_stock(db, req.items, req.reservation_id), "Stock reservation failed.")
+
+@router.post("/stock/release", summary="Release reserved stock", status_code=200, response_model=StockRead)
+def release_product_stock(req: StockRequest, db: DB_Session) -> StockRead:
+    """Return quantities from a previous reservation to stock in one transaction."""
+    return _apply_stock_change(db, lambda: release_stock(db, req.items, req.reservation_id), "Stock release failed.")
+
+
 @router.put("/update/{id}", summary="Update a product", status_code=200, response_model=ProductRead)
 def update_product(id: int, req_product: ProductUpdate, db: DB_Session) -> ProductRead:
     """Apply partial updates to a product, mutating only provided fields."""
@@ -77,6 +330,7 @@ def update_product(id: int, req_product: ProductUpdate, db: DB_Session) -> Produ
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found.")
 
     try:
+        previous = (product.category, product.price)
         if req_product.name is not None:
             product.name = req_product.name
         if req_product.price is not None:
@@ -86,9 +340,14 @@ def update_product(id: int, req_product: ProductUpdate, db: DB_Session) -> Produ
         if req_product.category is not None:
             product.category = req_product.category
         if req_product.stock is not None:
+            # An absolute stock level supersedes whatever the ledger still holds for this product.
+            discard_movements(db, [product.id])
             product.stock = req_product.stock
 
+        if (product.category, product.price) != previous:
+            apply_facet_deltas(db, facet_deltas(removed=[previous], added=[(product.category, product.price)]))
         db.commit()
+        product_cache.invalidate(id)
         db.refresh(product)
 
         return product
@@ -109,7 +368,11 @@ def delete_product(id:int,db:DB_Session)->ProductRead:
 
     try:
         db.delete(product)
+        db.add(ProductTombstone(product_id=product.id))
+        discard_movements(db, [product.id])
+        apply_facet_deltas(db, facet_deltas(removed=[(product.category, product.price)]))
         db.commit()
+        product_cache.invalidate(id)
         return product
     except SQLAlchemyError as exc:
         db.rollback()
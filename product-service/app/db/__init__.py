@@ -1,5 +1,6 @@
 """DB Package exports."""
 
-from app.db.session import engine, get_db
+from app.db.session import SessionLocal, engine, get_db
+from app.db.upsert import check_upsert_support, upsert_insert
 
-__all__ = ("engine", "get_db")
\ No newline at end of file
+__all__ = ("SessionLocal", "check_upsert_support", "engine", "get_db", "upsert_insert")
\ No newline at end of file
@@ -1,4 +1,7 @@
 from app.models.base import Base
+from app.models.facet import ProductFacet
+from app.models.inventory import InventoryMovement, StockReservation
 from app.models.product import Product
+from app.models.tombstone import ProductTombstone
 
-__all__ = ("Base", "Product")
\ No newline at end of file
+__all__ = ("Base", "InventoryMovement", "Product", "ProductFacet", "ProductTombstone", "StockReservation")
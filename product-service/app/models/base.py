@@ -1,4 +1,13 @@
+from sqlalchemy import DateTime
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import DeclarativeBase
 
+# SQLite's now() stores timestamps without fractional seconds. Binding parameters in the
+# same text format keeps equality and range comparisons on timestamps (keyset cursors) exact.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
 class Base(DeclarativeBase):
     pass
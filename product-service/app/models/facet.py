@@ -0,0 +1,15 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+class ProductFacet(Base):
+    """Maintained product count for one facet value, e.g. ("category", "shoes") or ("price", "1000")."""
+    __tablename__ = "product_facets"
+    
+    facet: Mapped[str] = mapped_column(String(20), primary_key=True)
+    key: Mapped[str] = mapped_column(String(50), primary_key=True)
+    product_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    def __repr__(self) -> str:
+        return f"ProductFacet(facet = {self.facet!r}, key = {self.key!r}, product_count = {self.product_count})"
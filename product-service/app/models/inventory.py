@@ -0,0 +1,44 @@
+from sqlalchemy import Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.models.base import Base, Timestamp
+
+class InventoryMovement(Base):
+    """One stock change not yet folded into `products.stock`; available stock is the snapshot plus these deltas."""
+    __tablename__ = "inventory_movements"
+    __table_args__ = (
+        Index("ix_inventory_movements_product_id", "product_id", "id"),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    delta: Mapped[int] = mapped_column(Integer, nullable=False)
+    reason: Mapped[str] = mapped_column(String(20), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        Timestamp,
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    def __repr__(self) -> str:
+        return f"InventoryMovement(product_id = {self.product_id}, delta = {self.delta}, reason = {self.reason!r})"
+
+
+class StockReservation(Base):
+    """Outcome of a reservation made under a caller-chosen id, so retrying or releasing it is idempotent."""
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        Index("ix_stock_reservations_created_at", "created_at"),
+    )
+    
+    reservation_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        Timestamp,
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    def __repr__(self) -> str:
+        return f"StockReservation(reservation_id = {self.reservation_id!r}, status = {self.status!r})"
@@ -1,11 +1,20 @@
-from sqlalchemy import DateTime, Integer, String, func
+from sqlalchemy import Index, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
-from app.models.base import Base
+from app.models.base import Base, Timestamp
 
 class Product(Base):
     __tablename__ = "products"
+    # Composite indexes back each catalog filter/sort pair and the change feed; the trailing id keeps keyset pages index-ordered.
+    __table_args__ = (
+        Index("ix_products_category_id", "category", "id"),
+        Index("ix_products_category_price", "category", "price", "id"),
+        Index("ix_products_category_created_at", "category", "created_at", "id"),
+        Index("ix_products_price", "price", "id"),
+        Index("ix_products_created_at", "created_at", "id"),
+        Index("ix_products_updated_at", "updated_at", "id"),
+    )
     
     id : Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
@@ -15,12 +24,12 @@ class Product(Base):
     stock: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False
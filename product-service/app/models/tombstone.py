@@ -0,0 +1,23 @@
+from sqlalchemy import Index, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.models.base import Base, Timestamp
+
+class ProductTombstone(Base):
+    """Marker left behind by a deleted product so change-feed consumers can drop it."""
+    __tablename__ = "product_tombstones"
+    __table_args__ = (
+        Index("ix_product_tombstones_deleted_at", "deleted_at", "product_id"),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(
+        Timestamp,
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    def __repr__(self) -> str:
+        return f"ProductTombstone(product_id = {self.product_id}, deleted_at = {self.deleted_at!r})"
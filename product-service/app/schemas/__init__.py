@@ -1,2 +1,40 @@
-from app.schemas.product import ProductBase, ProductRead, ProductUpdate
-__all__ = ("ProductBase", "ProductRead", "ProductUpdate")
\ No newline at end of file
+from app.schemas.product import (
+    CategoryFacet,
+    PriceBucketFacet,
+    ProductBase,
+    ProductBatchRead,
+    ProductBatchRequest,
+    ProductChange,
+    ProductChangeFeed,
+    ProductFacets,
+    ProductImportError,
+    ProductImportResult,
+    ProductPage,
+    ProductRead,
+    ProductSearchPage,
+    ProductUpdate,
+    StockLevel,
+    StockLine,
+    StockRead,
+    StockRequest,
+)
+__all__ = (
+    "CategoryFacet",
+    "PriceBucketFacet",
+    "ProductBase",
+    "ProductBatchRead",
+    "ProductBatchRequest",
+    "ProductChange",
+    "ProductChangeFeed",
+    "ProductFacets",
+    "ProductImportError",
+    "ProductImportResult",
+    "ProductPage",
+    "ProductRead",
+    "ProductSearchPage",
+    "ProductUpdate",
+    "StockLevel",
+    "StockLine",
+    "StockRead",
+    "StockRequest",
+)
\ No newline at end of file
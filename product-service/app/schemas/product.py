@@ -13,6 +13,79 @@ class ProductRead(ProductBase):
     created_at:datetime
     updated_at:datetime
     model_config=ConfigDict(from_attributes=True)
+
+class ProductPage(BaseModel):
+    items: list[ProductRead]
+    next_after: str | None = Field(default=None, description="Cursor for the next page, or null on the last page.")
+    
+class ProductSearchPage(BaseModel):
+    items: list[ProductRead]
+    next_offset: int | None = Field(default=None, description="Offset of the next page, or null on the last page.")
+
+class ProductBatchRequest(BaseModel):
+    ids: list[int] = Field(min_length=1)
+
+class ProductBatchRead(BaseModel):
+    items: list[ProductRead]
+    missing: list[int]
+    
+class ProductImportError(BaseModel):
+    row: int = Field(description="1-based position of the record in the upload, excluding any CSV header.")
+    error: str
+
+class ProductImportResult(BaseModel):
+    rows_received: int
+    rows_upserted: int
+    rows_rejected: int
+    batches: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: list[ProductImportError]
+    errors_truncated: bool = False
+    
+class StockLine(BaseModel):
+    product_id: int = Field(gt=0)
+    quantity: int = Field(gt=0)
+
+class StockRequest(BaseModel):
+    items: list[StockLine] = Field(min_length=1)
+    reservation_id: str | None = Field(
+        default=None,
+        min_length=1,
+        max_length=64,
+        description="Makes reserve and release idempotent: a retry is applied once, and releasing first refuses a late reserve.",
+    )
+
+class StockLevel(BaseModel):
+    product_id: int
+    stock: int
+
+class StockRead(BaseModel):
+    items: list[StockLevel]
+    
+class CategoryFacet(BaseModel):
+    category: str
+    count: int
+
+class PriceBucketFacet(BaseModel):
+    min_price: int
+    max_price: int | None = Field(default=None, description="Inclusive upper bound, or null for the open-ended top bucket.")
+    count: int
+
+class ProductFacets(BaseModel):
+    categories: list[CategoryFacet]
+    price_buckets: list[PriceBucketFacet]
+    
+class ProductChange(BaseModel):
+    product_id: int
+    changed_at: datetime
+    deleted: bool
+    product: ProductRead | None = Field(default=None, description="Current state of the product, or null for a deletion.")
+
+class ProductChangeFeed(BaseModel):
+    changes: list[ProductChange]
+    cursor: str | None = Field(default=None, description="Pass as `since` on the next call; unchanged when there is nothing new.")
+    has_more: bool
     
 class ProductUpdate(BaseModel):
     name: str | None = Field(min_length=3,max_length=50, default=None)
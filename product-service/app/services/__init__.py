@@ -0,0 +1,54 @@
+"""Service-layer helpers shared by the API routes."""
+
+from app.services.cache import CachedProduct, ProductCache, product_cache, product_etag
+from app.services.catalog import CatalogFilters, CatalogSort, apply_filters, apply_keyset, encode_cursor
+from app.services.changes import encode_change_cursor, prune_tombstones, read_changes
+from app.services.facets import apply_facet_deltas, facet_deltas, read_facets, rebuild_facets
+from app.services.importer import ImportFormat, import_products, upsert_products
+from app.services.inventory import (
+    INVENTORY_COMPACTION_INTERVAL_SECONDS,
+    STOCK_CHANGE_ATTEMPTS,
+    STOCK_CHANGE_BACKOFF_SECONDS,
+    available_stock,
+    compact_inventory,
+    discard_movements,
+    prune_reservations,
+    release_stock,
+    reserve_stock,
+    run_inventory_compaction,
+)
+from app.services.search import ensure_search_index, search_products
+
+__all__ = (
+    "INVENTORY_COMPACTION_INTERVAL_SECONDS",
+    "STOCK_CHANGE_ATTEMPTS",
+    "STOCK_CHANGE_BACKOFF_SECONDS",
+    "CachedProduct",
+    "CatalogFilters",
+    "CatalogSort",
+    "ImportFormat",
+    "ProductCache",
+    "apply_facet_deltas",
+    "apply_filters",
+    "apply_keyset",
+    "available_stock",
+    "compact_inventory",
+    "discard_movements",
+    "encode_change_cursor",
+    "encode_cursor",
+    "ensure_search_index",
+    "facet_deltas",
+    "import_products",
+    "product_cache",
+    "product_etag",
+    "prune_reservations",
+    "prune_tombstones",
+    "read_changes",
+    "read_facets",
+    "rebuild_facets",
+    "release_stock",
+    "reserve_stock",
+    "run_inventory_compaction",
+    "search_products",
+    "upsert_products",
+)
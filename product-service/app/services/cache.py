@@ -0,0 +1,143 @@
+"""In-process read-through cache for serialized products."""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+import hashlib
+import os
+import time
+
+from app.models import Product
+
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "10000"))
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "60"))
+
+
+def product_etag(product: Product) -> str:
+    """Build a strong ETag for a product row without serializing it.
+
+    `updated_at` alone is not enough because SQLite's `now()` only has second
+    resolution, so the mutable columns are folded into the digest as well.
+    """
+    key = "\x1f".join(
+        str(value)
+        for value in (
+            product.id,
+            product.updated_at.isoformat(),
+            product.name,
+            product.price,
+            product.description,
+            product.category,
+            product.stock,
+        )
+    )
+    return f'"{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"'
+
+
+@dataclass(frozen=True)
+class CachedProduct:
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+class ProductCache:
+    """Bounded LRU cache of product JSON bodies whose entries also expire after a TTL.
+
+    Handlers run in the threadpool, so every operation takes the lock. The cache is
+    per process: other workers only see a change once their own entry expires.
+
+    Readers take `generation()` before loading a row and pass it to `put`, which drops
+    the value if the product was invalidated since: the row may predate the write that
+    invalidated it. Invalidation generations are remembered per product up to
+    `max_entries` products; beyond that every older reader is refused.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, CachedProduct] = OrderedDict()
+        self._lock = Lock()
+        self._generation = 0
+        # product_id -> generation of its last invalidation; older ones are covered by `_floor`.
+        self._invalidated: dict[int, int] = {}
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def generation(self) -> int:
+        """Current invalidation generation; take it before reading the row that will be `put`."""
+        with self._lock:
+            return self._generation
+
+    def _bump(self, product_id: int | None) -> None:
+        self._generation += 1
+        if product_id is None or len(self._invalidated) >= self.max_entries:
+            self._invalidated.clear()
+            self._floor = self._generation
+        else:
+            self._invalidated[product_id] = self._generation
+
+    def get(self, product_id: int) -> CachedProduct | None:
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[product_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(product_id)
+            self.hits += 1
+            return entry
+
+    def put(self, product_id: int, body: bytes, etag: str, generation: int) -> CachedProduct:
+        """Cache a body read at `generation`, unless the product was invalidated since; returns the entry either way."""
+        entry = CachedProduct(body=body, etag=etag, expires_at=time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            if max(self._floor, self._invalidated.get(product_id, 0)) > generation:
+                self.stale_puts += 1
+                return entry
+            self._entries[product_id] = entry
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, product_id: int) -> None:
+        with self._lock:
+            self._bump(product_id)
+            if self._entries.pop(product_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bump(None)
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+
+product_cache = ProductCache(PRODUCT_CACHE_MAX_ENTRIES, PRODUCT_CACHE_TTL_SECONDS)
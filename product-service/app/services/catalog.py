@@ -0,0 +1,80 @@
+"""Filtering, sorting and keyset cursors for catalog listings."""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Literal
+
+from sqlalchemy import Select, and_, or_
+
+from app.models import Product
+
+CatalogSort = Literal["id", "price_asc", "price_desc", "newest"]
+
+# Sort key column and direction; `id` always breaks ties in the same direction.
+_SORT_KEYS = {
+    "id": (None, False),
+    "price_asc": (Product.price, False),
+    "price_desc": (Product.price, True),
+    "newest": (Product.created_at, True),
+}
+
+
+@dataclass(frozen=True)
+class CatalogFilters:
+    category: str | None = None
+    min_price: int | None = None
+    max_price: int | None = None
+    in_stock: bool = False
+
+
+def apply_filters(stmt: Select, filters: CatalogFilters) -> Select:
+    if filters.category is not None:
+        stmt = stmt.where(Product.category == filters.category)
+    if filters.min_price is not None:
+        stmt = stmt.where(Product.price >= filters.min_price)
+    if filters.max_price is not None:
+        stmt = stmt.where(Product.price <= filters.max_price)
+    if filters.in_stock:
+        stmt = stmt.where(Product.stock > 0)
+    return stmt
+
+
+def encode_cursor(product: Any, sort: CatalogSort) -> str:
+    """Build the opaque cursor for the row a page ended on.
+
+    Accepts ORM instances as well as Core rows, which both expose columns as attributes.
+    """
+    column, _ = _SORT_KEYS[sort]
+    if column is None:
+        return str(product.id)
+    value = getattr(product, column.key)
+    return f"{value.isoformat() if isinstance(value, datetime) else value},{product.id}"
+
+
+def apply_keyset(stmt: Select, sort: CatalogSort, after: str | None) -> Select:
+    """Order by the sort key and skip everything up to and including the cursor.
+
+    Raises ValueError when the cursor does not belong to the requested sort order.
+    """
+    column, descending = _SORT_KEYS[sort]
+    if column is None:
+        if after is not None:
+            stmt = stmt.where(Product.id > int(after))
+        return stmt.order_by(Product.id)
+
+    if descending:
+        stmt = stmt.order_by(column.desc(), Product.id.desc())
+    else:
+        stmt = stmt.order_by(column, Product.id)
+    if after is None:
+        return stmt
+
+    raw_value, _, raw_id = after.rpartition(",")
+    if not raw_value:
+        raise ValueError("Cursor does not match the sort order.")
+    value = datetime.fromisoformat(raw_value) if column is Product.created_at else int(raw_value)
+    last_id = int(raw_id)
+    # Expanded row-value comparison; each branch can use the (key, id) composite index.
+    if descending:
+        return stmt.where(or_(column < value, and_(column == value, Product.id < last_id)))
+    return stmt.where(or_(column > value, and_(column == value, Product.id > last_id)))
@@ -0,0 +1,79 @@
+"""Incremental change feed over product updates and deletions.
+
+Consumers keep the cursor of the last change they applied and ask for everything
+after it, so each sync costs as much as the number of changes, not the catalog size.
+Deletions come from `product_tombstones`, which `delete_product` writes in the same
+transaction as the delete.
+
+A change is only served once it is `PRODUCT_CHANGE_FEED_LAG_SECONDS` old by the
+database clock. Timestamps have whole-second resolution on SQLite and are the
+transaction start time on Postgres, so a fresher change could still be joined by one
+that sorts before it; serving it would move the cursor past the late one for good.
+"""
+
+from datetime import datetime, timedelta, timezone
+import heapq
+import os
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Product, ProductTombstone
+
+PRODUCT_TOMBSTONE_RETENTION_DAYS = int(os.getenv("PRODUCT_TOMBSTONE_RETENTION_DAYS", "30"))
+# Must exceed the timestamp resolution and the longest write transaction.
+PRODUCT_CHANGE_FEED_LAG_SECONDS = float(os.getenv("PRODUCT_CHANGE_FEED_LAG_SECONDS", "5"))
+
+# (changed_at, product_id, product or None for a deletion)
+Change = tuple[datetime, int, Product | None]
+
+
+def encode_change_cursor(changed_at: datetime, product_id: int) -> str:
+    return f"{changed_at.isoformat()},{product_id}"
+
+
+def decode_change_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError for malformed cursors."""
+    raw_changed_at, _, raw_id = cursor.rpartition(",")
+    return datetime.fromisoformat(raw_changed_at), int(raw_id)
+
+
+def read_changes(db: Session, since: str | None, limit: int) -> list[Change]:
+    """Return up to `limit` settled changes after the cursor, ordered by (changed_at, product_id)."""
+    horizon = db.execute(select(func.now())).scalar_one() - timedelta(seconds=PRODUCT_CHANGE_FEED_LAG_SECONDS)
+    product_stmt = (
+        select(Product).where(Product.updated_at < horizon).order_by(Product.updated_at, Product.id).limit(limit)
+    )
+    tombstone_stmt = (
+        select(ProductTombstone.deleted_at, ProductTombstone.product_id)
+        .where(ProductTombstone.deleted_at < horizon)
+        .order_by(ProductTombstone.deleted_at, ProductTombstone.product_id)
+        .limit(limit)
+    )
+    if since is not None:
+        changed_at, product_id = decode_change_cursor(since)
+        product_stmt = product_stmt.where(
+            or_(Product.updated_at > changed_at, and_(Product.updated_at == changed_at, Product.id > product_id))
+        )
+        tombstone_stmt = tombstone_stmt.where(
+            or_(
+                ProductTombstone.deleted_at > changed_at,
+                and_(ProductTombstone.deleted_at == changed_at, ProductTombstone.product_id > product_id),
+            )
+        )
+
+    updates = ((product.updated_at, product.id, product) for product in db.execute(product_stmt).scalars())
+    deletions = ((deleted_at, product_id, None) for deleted_at, product_id in db.execute(tombstone_stmt))
+    merged = heapq.merge(updates, deletions, key=lambda change: (change[0], change[1]))
+    return [change for _, change in zip(range(limit), merged)]
+
+
+def prune_tombstones(db: Session, retention_days: int = PRODUCT_TOMBSTONE_RETENTION_DAYS) -> int:
+    """Delete tombstones older than the retention window and commit. Returns the number removed.
+
+    Consumers that fall further behind than the window must resync from an empty cursor.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = db.execute(delete(ProductTombstone).where(ProductTombstone.deleted_at < cutoff))
+    db.commit()
+    return result.rowcount
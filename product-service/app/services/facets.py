@@ -0,0 +1,95 @@
+"""Category and price-bucket counts maintained alongside product writes.
+
+Every write path adjusts the `product_facets` rows in the same transaction, so a
+facet lookup reads one row per category or bucket instead of grouping the whole
+catalog. `rebuild_facets` recomputes everything from `products` and fixes any drift.
+"""
+
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Iterable
+
+from sqlalchemy import case, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.db import upsert_insert
+from app.models import Product, ProductFacet
+
+CATEGORY_FACET = "category"
+PRICE_FACET = "price"
+
+# Lower bounds of the price buckets; the last bucket is open-ended and
+# anything below the first bound is counted in the first bucket.
+PRICE_BUCKETS = (0, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+FacetKey = tuple[str, str]
+
+
+def price_bucket(price: int) -> int:
+    return PRICE_BUCKETS[max(bisect_right(PRICE_BUCKETS, price) - 1, 0)]
+
+
+def facet_keys(category: str, price: int) -> tuple[FacetKey, FacetKey]:
+    return (CATEGORY_FACET, category), (PRICE_FACET, str(price_bucket(price)))
+
+
+def facet_deltas(removed: Iterable[tuple[str, int]] = (), added: Iterable[tuple[str, int]] = ()) -> Counter[FacetKey]:
+    """Net count changes for products leaving and entering (category, price) combinations."""
+    deltas: Counter[FacetKey] = Counter()
+    for category, price in removed:
+        for key in facet_keys(category, price):
+            deltas[key] -= 1
+    for category, price in added:
+        for key in facet_keys(category, price):
+            deltas[key] += 1
+    return deltas
+
+
+def apply_facet_deltas(db: Session, deltas: Counter[FacetKey]) -> None:
+    """Add the deltas to the stored counts in one upsert. The caller commits."""
+    rows = [{"facet": facet, "key": key, "product_count": delta} for (facet, key), delta in deltas.items() if delta]
+    if not rows:
+        return
+    stmt = upsert_insert(db, ProductFacet.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["facet", "key"],
+        set_={"product_count": ProductFacet.__table__.c.product_count + stmt.excluded.product_count},
+    )
+    db.execute(stmt)
+
+
+def rebuild_facets(db: Session) -> int:
+    """Recompute every facet count from the products table and commit. Returns the number of facet rows."""
+    bucket = case(
+        *((Product.price >= bound, literal(str(bound))) for bound in reversed(PRICE_BUCKETS[1:])),
+        else_=literal(str(PRICE_BUCKETS[0])),
+    )
+    facets = ProductFacet.__table__
+    db.execute(delete(facets))
+    db.execute(
+        insert(facets).from_select(
+            ["facet", "key", "product_count"],
+            select(literal(CATEGORY_FACET), Product.category, func.count()).group_by(Product.category),
+        )
+    )
+    db.execute(
+        insert(facets).from_select(
+            ["facet", "key", "product_count"],
+            select(literal(PRICE_FACET), bucket, func.count()).group_by(bucket),
+        )
+    )
+    db.commit()
+    return db.execute(select(func.count()).select_from(facets)).scalar_one()
+
+
+def read_facets(db: Session) -> tuple[list[tuple[str, int]], list[tuple[int, int | None, int]]]:
+    """Return (category, count) pairs and (min_price, max_price, count) buckets with products in them."""
+    rows = db.execute(
+        select(ProductFacet.facet, ProductFacet.key, ProductFacet.product_count).where(ProductFacet.product_count > 0)
+    ).all()
+
+    categories = sorted((key, count) for facet, key, count in rows if facet == CATEGORY_FACET)
+    bucket_counts = {int(key): count for facet, key, count in rows if facet == PRICE_FACET}
+    upper_bounds = dict(zip(PRICE_BUCKETS, (*(bound - 1 for bound in PRICE_BUCKETS[1:]), None)))
+    buckets = [(bound, upper_bounds.get(bound), count) for bound, count in sorted(bucket_counts.items())]
+    return categories, buckets
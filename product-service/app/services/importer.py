@@ -0,0 +1,188 @@
+"""Streaming bulk import of products from CSV or NDJSON uploads."""
+
+from collections.abc import AsyncIterator
+from typing import Literal
+import codecs
+import csv
+import json
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.db import upsert_insert
+from app.models import Product
+from app.schemas import ProductBase, ProductImportError, ProductImportResult
+from app.services.cache import product_cache
+from app.services.facets import apply_facet_deltas, facet_deltas
+from app.services.inventory import discard_movements
+
+ImportFormat = Literal["csv", "ndjson"]
+
+# Rows per multi-row upsert statement; each batch is committed on its own.
+IMPORT_BATCH_SIZE = 500
+# Cap on the per-row errors echoed back so a broken feed cannot blow up the response.
+MAX_REPORTED_ERRORS = 1000
+
+# A parsed record is either the raw field mapping or a message explaining why it could not be parsed.
+Record = tuple[int, dict | str]
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without buffering the whole upload."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.removesuffix("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.removesuffix("\r")
+
+
+async def _iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    """Yield CSV rows keyed by the header, allowing quoted fields to span lines."""
+    header: list[str] | None = None
+    buffer: list[str] = []
+    row = 0
+    async for line in lines:
+        buffer.append(line)
+        text = "\n".join(buffer)
+        # An odd number of quotes means a quoted field continues on the next line.
+        if text.count('"') % 2:
+            continue
+        buffer.clear()
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}."
+            continue
+        # Empty cells fall back to the schema defaults instead of failing int parsing.
+        yield row, {name: value for name, value in zip(header, values) if value != ""}
+
+    if buffer:
+        yield row + 1, "Unterminated quoted field."
+
+
+async def _iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    """Yield one JSON object per non-blank line."""
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row, f"Invalid JSON: {exc.msg}."
+            continue
+        if not isinstance(record, dict):
+            yield row, "Expected a JSON object."
+            continue
+        yield row, record
+
+
+def _describe_validation_error(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors())
+
+
+def upsert_products(db: Session, rows: list[dict]) -> list[int]:
+    """Insert or update a batch of validated products keyed on their unique name."""
+    # Postgres refuses to touch the same row twice in one statement, so the last duplicate wins.
+    unique_rows = list({row["name"]: row for row in rows}.values())
+    # Facet counts need the previous category and price of rows the upsert will overwrite.
+    previous = db.execute(
+        select(Product.category, Product.price).where(Product.name.in_([row["name"] for row in unique_rows]))
+    ).all()
+
+    stmt = upsert_insert(db, Product.__table__).values(unique_rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={
+            "price": stmt.excluded.price,
+            "description": stmt.excluded.description,
+            "category": stmt.excluded.category,
+            "stock": stmt.excluded.stock,
+            "updated_at": func.now(),
+        },
+    ).returning(Product.__table__.c.id)
+
+    ids = list(db.execute(stmt).scalars().all())
+    # The feed carries absolute stock levels, which supersede any pending ledger movements.
+    discard_movements(db, ids)
+    apply_facet_deltas(db, facet_deltas(previous, ((row["category"], row["price"]) for row in unique_rows)))
+    db.commit()
+    return ids
+
+
+async def import_products(chunks: AsyncIterator[bytes], fmt: ImportFormat, db: Session) -> ProductImportResult:
+    """Validate and upsert an uploaded feed batch by batch, collecting per-row errors."""
+    started = time.perf_counter()
+    received = upserted = rejected = batches = 0
+    errors: list[ProductImportError] = []
+    batch: list[tuple[int, dict]] = []
+
+    def reject(row: int, message: str) -> None:
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(ProductImportError(row=row, error=message))
+
+    async def flush() -> None:
+        nonlocal upserted, batches
+        batches += 1
+        try:
+            ids = await run_in_threadpool(upsert_products, db, [values for _, values in batch])
+        except SQLAlchemyError as exc:
+            db.rollback()
+            for row, _ in batch:
+                reject(row, f"Batch write failed: {exc.__class__.__name__}.")
+        else:
+            upserted += len(batch)
+            for product_id in ids:
+                product_cache.invalidate(product_id)
+        batch.clear()
+
+    lines = _iter_lines(chunks)
+    records = _iter_csv_records(lines) if fmt == "csv" else _iter_ndjson_records(lines)
+    async for row, record in records:
+        received += 1
+        if isinstance(record, str):
+            reject(row, record)
+            continue
+        try:
+            product = ProductBase.model_validate(record)
+        except ValidationError as exc:
+            reject(row, _describe_validation_error(exc))
+            continue
+
+        batch.append((row, product.model_dump()))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+
+    elapsed = time.perf_counter() - started
+    return ProductImportResult(
+        rows_received=received,
+        rows_upserted=upserted,
+        rows_rejected=rejected,
+        batches=batches,
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round(upserted / elapsed, 1) if elapsed else 0.0,
+        errors=errors,
+        errors_truncated=rejected > len(errors),
+    )
@@ -0,0 +1,237 @@
+"""Stock reservations recorded in an append-only inventory ledger.
+
+Every stock change is an INSERT into `inventory_movements` rather than an UPDATE of
+the product row, so a flash sale on one product does not queue every checkout behind
+the same row lock. Available stock is the `products.stock` snapshot plus the movements
+recorded since; `compact_inventory` periodically folds movements into the snapshot so
+that sum stays short.
+
+A reservation may carry a caller-chosen id. `stock_reservations` then records whether
+it is held or released, so a retried reserve is applied once and a release sent for a
+reserve whose outcome the caller never saw returns the stock if it landed, or refuses
+the reserve if it is still on its way.
+"""
+
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models import InventoryMovement, Product, StockReservation
+from app.schemas import StockLine
+from app.services.cache import product_cache
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_COMPACTION_INTERVAL_SECONDS = float(os.getenv("INVENTORY_COMPACTION_INTERVAL_SECONDS", "5"))
+# Movements folded per transaction, so one compaction never holds locks for long.
+COMPACTION_BATCH_SIZE = 10000
+# Attempts at a reserve or release that loses a serialization race before answering 409.
+STOCK_CHANGE_ATTEMPTS = int(os.getenv("STOCK_CHANGE_ATTEMPTS", "5"))
+STOCK_CHANGE_BACKOFF_SECONDS = float(os.getenv("STOCK_CHANGE_BACKOFF_SECONDS", "0.01"))
+STOCK_RESERVATION_RETENTION_DAYS = int(os.getenv("STOCK_RESERVATION_RETENTION_DAYS", "7"))
+
+RESERVE = "reserve"
+RELEASE = "release"
+
+RESERVED = "RESERVED"
+RELEASED = "RELEASED"
+
+
+def _merge_lines(lines: list[StockLine]) -> list[tuple[int, int]]:
+    """Sum quantities per product, ordered by id."""
+    totals: Counter[int] = Counter()
+    for line in lines:
+        totals[line.product_id] += line.quantity
+    return sorted(totals.items())
+
+
+def _record_movements(db: Session, lines: Iterable[tuple[int, int]], reason: str) -> None:
+    db.execute(
+        insert(InventoryMovement.__table__),
+        [{"product_id": product_id, "delta": delta, "reason": reason} for product_id, delta in lines],
+    )
+
+
+def _not_found(product_ids: list[int]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail={"message": "Products not found.", "product_ids": product_ids},
+    )
+
+
+def _reservation_status(db: Session, reservation_id: str) -> str | None:
+    return db.execute(
+        select(StockReservation.status).where(StockReservation.reservation_id == reservation_id)
+    ).scalar_one_or_none()
+
+
+def available_stock(db: Session, product_ids: list[int]) -> dict[int, int]:
+    """Return snapshot plus pending movements for each existing product in the list."""
+    movements = InventoryMovement.__table__
+    pending = (
+        select(movements.c.product_id, func.sum(movements.c.delta).label("delta"))
+        .where(movements.c.product_id.in_(product_ids))
+        .group_by(movements.c.product_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(Product.id, Product.stock + func.coalesce(pending.c.delta, 0))
+        .outerjoin(pending, pending.c.product_id == Product.id)
+        .where(Product.id.in_(product_ids))
+    ).all()
+    return dict(rows)
+
+
+def reserve_stock(db: Session, lines: list[StockLine], reservation_id: str | None = None) -> dict[int, int]:
+    """Take stock for every line or none of them, returning the available stock afterwards.
+
+    The movements are inserted first and the resulting balances checked in the same
+    transaction, which runs SERIALIZABLE: on Postgres two reservations racing for the
+    last units conflict instead of both passing the check, and on SQLite the insert
+    takes the write lock before the check reads. A `reservation_id` that is already
+    held takes nothing more; one that was released is refused with 409. The caller commits.
+    """
+    merged = _merge_lines(lines)
+    product_ids = [product_id for product_id, _ in merged]
+    db.connection(execution_options={"isolation_level": "SERIALIZABLE"})
+    if reservation_id is not None:
+        held = _reservation_status(db, reservation_id)
+        if held == RESERVED:
+            return available_stock(db, product_ids)
+        if held == RELEASED:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Reservation was already released.")
+        # Two requests racing on the same id collide on the primary key and one is rolled back.
+        db.execute(insert(StockReservation.__table__).values(reservation_id=reservation_id, status=RESERVED))
+    _record_movements(db, ((product_id, -quantity) for product_id, quantity in merged), RESERVE)
+    available = available_stock(db, product_ids)
+
+    missing = [product_id for product_id in product_ids if product_id not in available]
+    if missing:
+        db.rollback()
+        raise _not_found(missing)
+
+    short = [(product_id, quantity) for product_id, quantity in merged if available[product_id] < 0]
+    if short:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Insufficient stock.",
+                "items": [
+                    {"product_id": product_id, "requested": quantity, "available": available[product_id] + quantity}
+                    for product_id, quantity in short
+                ],
+            },
+        )
+
+    return available
+
+
+def release_stock(db: Session, lines: list[StockLine], reservation_id: str | None = None) -> dict[int, int]:
+    """Return previously reserved quantities to stock, all-or-nothing. The caller commits.
+
+    With a `reservation_id`, only a held reservation gives its stock back, once. An id
+    that was never reserved is recorded as released so a reserve arriving later is refused.
+    """
+    merged = _merge_lines(lines)
+    product_ids = [product_id for product_id, _ in merged]
+    existing = set(db.execute(select(Product.id).where(Product.id.in_(product_ids))).scalars())
+    missing = [product_id for product_id in product_ids if product_id not in existing]
+    if missing:
+        raise _not_found(missing)
+
+    if reservation_id is not None:
+        reservations = StockReservation.__table__
+        released = db.execute(
+            update(reservations)
+            .where((reservations.c.reservation_id == reservation_id) & (reservations.c.status == RESERVED))
+            .values(status=RELEASED)
+        )
+        if released.rowcount == 0:
+            if _reservation_status(db, reservation_id) is None:
+                db.execute(insert(reservations).values(reservation_id=reservation_id, status=RELEASED))
+            return available_stock(db, product_ids)
+    _record_movements(db, merged, RELEASE)
+    return available_stock(db, product_ids)
+
+
+def discard_movements(db: Session, product_ids: list[int]) -> None:
+    """Drop pending movements for products whose stock is being overwritten or deleted. The caller commits."""
+    db.execute(delete(InventoryMovement).where(InventoryMovement.product_id.in_(product_ids)))
+
+
+def compact_inventory(db: Session) -> int:
+    """Fold pending movements into `products.stock` and commit. Returns the number of movements folded.
+
+    Each batch deletes movements with RETURNING and applies exactly the returned deltas in
+    the same transaction, so readers see either the movements or the updated snapshot.
+    """
+    movements = InventoryMovement.__table__
+    products = Product.__table__
+    apply_delta = (
+        update(products)
+        .where(products.c.id == bindparam("b_product_id"))
+        .values(stock=products.c.stock + bindparam("b_delta"))
+    )
+
+    folded = 0
+    while True:
+        oldest = select(movements.c.id).order_by(movements.c.id).limit(COMPACTION_BATCH_SIZE).scalar_subquery()
+        rows = db.execute(
+            delete(movements).where(movements.c.id.in_(oldest)).returning(movements.c.product_id, movements.c.delta)
+        ).all()
+        if not rows:
+            break
+
+        deltas: Counter[int] = Counter()
+        for product_id, delta in rows:
+            deltas[product_id] += delta
+        changed = [{"b_product_id": product_id, "b_delta": delta} for product_id, delta in deltas.items() if delta]
+        if changed:
+            db.execute(apply_delta, changed)
+        db.commit()
+
+        for product_id in deltas:
+            product_cache.invalidate(product_id)
+        folded += len(rows)
+        if len(rows) < COMPACTION_BATCH_SIZE:
+            break
+
+    return folded
+
+
+def prune_reservations(db: Session, retention_days: int = STOCK_RESERVATION_RETENTION_DAYS) -> int:
+    """Delete reservation records older than the retention window and commit. Returns the number removed.
+
+    Retries and releases of a reservation must arrive within the window to be recognised.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = db.execute(delete(StockReservation).where(StockReservation.created_at < cutoff))
+    db.commit()
+    return result.rowcount
+
+
+def _compact_with_new_session() -> int:
+    with SessionLocal() as db:
+        return compact_inventory(db)
+
+
+async def run_inventory_compaction(interval: float = INVENTORY_COMPACTION_INTERVAL_SECONDS) -> None:
+    """Compact the ledger every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_compact_with_new_session)
+        except SQLAlchemyError:
+            logger.exception("Inventory compaction failed; retrying on the next run.")
@@ -0,0 +1,111 @@
+"""Full-text product search over name, description and category.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers, so every
+write path (including bulk upserts) updates the index in the same transaction.
+PostgreSQL uses a GIN expression index over a weighted tsvector, which the
+database maintains on every write.
+"""
+
+import re
+
+from sqlalchemy import Engine, select, text
+from sqlalchemy.orm import Session
+
+from app.models import Product
+
+# Only the first few terms are used; longer queries rarely improve ranking but cost more to match.
+MAX_QUERY_TERMS = 8
+
+_SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+)
+
+# The query must repeat this expression verbatim for Postgres to use the index.
+_PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', category), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C')"
+)
+
+_PG_DDL = (f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN (({_PG_DOCUMENT}))",)
+
+# bm25 weights follow the FTS5 column order: name, description, category.
+_SQLITE_SEARCH = text(
+    """
+    SELECT products.* FROM products_fts
+    JOIN products ON products.id = products_fts.rowid
+    WHERE products_fts MATCH :query
+    ORDER BY bm25(products_fts, 10.0, 1.0, 4.0), products.id
+    LIMIT :limit OFFSET :offset
+    """
+)
+
+_PG_SEARCH = text(
+    f"""
+    SELECT products.* FROM products, to_tsquery('simple', :query) AS query
+    WHERE ({_PG_DOCUMENT}) @@ query
+    ORDER BY ts_rank(({_PG_DOCUMENT}), query) DESC, products.id
+    LIMIT :limit OFFSET :offset
+    """
+)
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the text index for the current backend, backfilling it on first creation."""
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+            ).first() is not None
+            for statement in _SQLITE_DDL:
+                conn.execute(text(statement))
+            if not existed:
+                conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            for statement in _PG_DDL:
+                conn.execute(text(statement))
+
+
+def _query_terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS]
+
+
+def search_products(db: Session, query: str, limit: int, offset: int) -> list[Product]:
+    """Return products matching every term (each as a prefix), best matches first."""
+    terms = _query_terms(query)
+    if not terms:
+        return []
+
+    if db.get_bind().dialect.name == "postgresql":
+        stmt, match = _PG_SEARCH, " & ".join(f"{term}:*" for term in terms)
+    else:
+        stmt, match = _SQLITE_SEARCH, " ".join(f'"{term}"*' for term in terms)
+
+    params = {"query": match, "limit": limit, "offset": offset}
+    return list(db.execute(select(Product).from_statement(stmt), params).scalars().all())
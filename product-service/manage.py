@@ -0,0 +1,68 @@
+"""Maintenance commands for the product service.
+
+Usage: python manage.py <command>
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+
+def rebuild_facets() -> None:
+    from app.db import SessionLocal, engine
+    from app.models import Base
+    from app.services import rebuild_facets as rebuild
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        print(f"Rebuilt {rebuild(db)} facet rows.")
+
+
+def compact_inventory() -> None:
+    from app.db import SessionLocal, engine
+    from app.models import Base
+    from app.services import compact_inventory as compact
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        print(f"Folded {compact(db)} inventory movements.")
+
+
+def prune_tombstones() -> None:
+    from app.db import SessionLocal, engine
+    from app.models import Base
+    from app.services import prune_tombstones as prune
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        print(f"Pruned {prune(db)} product tombstones.")
+
+
+def prune_reservations() -> None:
+    from app.db import SessionLocal, engine
+    from app.models import Base
+    from app.services import prune_reservations as prune
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        print(f"Pruned {prune(db)} stock reservations.")
+
+
+COMMANDS = {
+    "compact-inventory": compact_inventory,
+    "prune-reservations": prune_reservations,
+    "prune-tombstones": prune_tombstones,
+    "rebuild-facets": rebuild_facets,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Product service maintenance commands.")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    load_dotenv()
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()